@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd
-import json
+import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+import pyarrow.compute as pc
+import orjson
+import xxhash
 from datetime import datetime, timedelta
-import streamlit.components.v1 as components
-import base64
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+from heapq import nlargest
+import io
+import html
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ---------- CONFIG ----------
 st.set_page_config(page_title="🧙‍♂️ CoachGnome – AI Call Coach", layout="wide")
@@ -12,234 +23,1024 @@ st.set_page_config(page_title="🧙‍♂️ CoachGnome – AI Call Coach", layo
 # Google Sheets URL
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1pKtkFr5x4_RRj-ruXnLZl3D4_IBzkyOnynWjjPac0jo/export?format=csv"
 
+ISO_DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+
+# (connect, read) seconds for audio downloads; HTTPAdapter handles retries
+DOWNLOAD_TIMEOUT = (10, 120)
+# Large reads keep the per-chunk Python overhead low on multi-MB recordings
+AUDIO_CHUNK_SIZE = 128 * 1024
+PREFETCH_WORKERS = 4
+# Only the first few call cards are warmed; the rest download when opened
+PREFETCH_CARDS = 4
+# Recordings kept per browser session, least recently played evicted first
+AUDIO_CACHE_SIZE = 12
+
+# Sheet columns always read as strings
+TEXT_COLUMNS = ['agent_name', 'date', 'filename', 'transcript', 'feedback_json', 'disposition']
+
+# Characters of a transcript sent before the user asks for the rest
+TRANSCRIPT_PREVIEW_CHARS = 2000
+
+# Keyword search results rendered per "Load more" step
+SEARCH_PAGE_SIZE = 50
+
+# Flattened feedback fields (nested keys joined with "_")
+SCORE_TYPES = [
+    'overall',
+    'active_listening',
+    'probing_depth',
+    'emotional_intelligence',
+    'value_based_selling',
+    'spin_effectiveness',
+    'sandler_effectiveness',
+    'objection_handling'
+]
+SCORE_COLUMNS = [f'call_score_{score_type}' for score_type in SCORE_TYPES]
+OUTCOME_ICONS = {
+    "closed": "🟢",
+    "lost": "🔴",
+    "follow-up-scheduled": "🟡",
+    "needs-callback": "🟠"
+}
+
+EMOTION_ICONS = {
+    "frustration": "😤", "hesitation": "🤔", "excitement": "😊",
+    "concern": "😟", "doubt": "🤨", "fear": "😰",
+    "distrust": "🤐", "pain": "😣", "relief": "😌"
+}
+
+# Exceptional moment categories
+CATEGORY_ICONS = {
+    'objection_handling': '🛡️',
+    'empathy': '❤️',
+    'active_listening': '🎧',
+    'probing': '🔍'
+}
+
+# Sample phrase lists shown on each call card, flattened from feedback['sample_phrases']
+PHRASE_COLUMNS = [
+    'sample_phrases_active_listening',
+    'sample_phrases_probing_deeper',
+    'sample_phrases_emotional_acknowledgment',
+    'sample_phrases_spin_implication',
+    'sample_phrases_sandler_pain'
+]
+
+# List-valued fields a call card loops over; missing ones become [] at load time
+CARD_LIST_COLUMNS = [
+    'what_went_well',
+    'opportunities_to_improve',
+    'active_listening_failures',
+    'missed_probing_opportunities',
+    'emotional_cues_missed',
+    'objection_handling_analysis'
+] + PHRASE_COLUMNS
+
+FEEDBACK_COLUMNS = [
+    'summary',
+    'customer_intent',
+    'close_reason',
+    'call_outcome',
+    'what_went_well',
+    'opportunities_to_improve',
+    'active_listening_failures',
+    'missed_probing_opportunities',
+    'emotional_cues_missed',
+    'objection_handling_analysis',
+    'exceptional_moments',
+    'call_score_overall_score',
+    'spin_analysis_situation_questions_used',
+    'spin_analysis_problem_questions_used',
+    'spin_analysis_implication_questions_used',
+    'spin_analysis_need_payoff_questions_used',
+    'sandler_analysis_upfront_contract_established',
+    'sandler_analysis_pain_depth',
+    'sandler_analysis_budget_qualified',
+    'sandler_analysis_decision_process_identified'
+] + SCORE_COLUMNS + PHRASE_COLUMNS
+
 # ---------- AUDIO DOWNLOAD ----------
-@st.cache_data(ttl=3600)
-def download_audio_from_gdrive(drive_url, filename):
-    """Download audio from Google Drive and return as base64"""
-    file_id = None
+@st.cache_resource
+def get_http_session():
+    """Shared keep-alive session; retries reuse pooled connections to Drive"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 502, 503, 504])
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    return session
+
+def extract_drive_file_id(drive_url):
+    """Pull the file ID out of a Google Drive share link"""
     if "id=" in drive_url:
-        file_id = drive_url.split("id=")[1].split("&")[0]
+        return drive_url.split("id=")[1].split("&")[0]
     elif "/d/" in drive_url:
-        file_id = drive_url.split("/d/")[1].split("/")[0]
-    
+        return drive_url.split("/d/")[1].split("/")[0]
+    return None
+
+def fetch_drive_audio(session, file_id):
+    """Download a Drive file and return its bytes (no st.* calls, safe in worker threads)"""
+    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+    response = session.get(download_url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    
+    for key, value in response.cookies.items():
+        if key.startswith('download_warning'):
+            params = {'confirm': value, 'id': file_id}
+            response = session.get(download_url, params=params, stream=True, timeout=DOWNLOAD_TIMEOUT)
+            break
+    
+    audio_buffer = io.BytesIO()
+    for chunk in response.iter_content(chunk_size=AUDIO_CHUNK_SIZE):
+        audio_buffer.write(chunk)
+    return audio_buffer.getvalue()
+
+def download_audio_from_gdrive(drive_url, filename):
+    """Download audio from Google Drive and return the raw bytes"""
+    file_id = extract_drive_file_id(drive_url)
     if not file_id:
         return None
     
-    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    max_retries = 3
-    timeouts = [60, 90, 120]
+    audio_bytes = get_cached_audio(file_id)
+    if audio_bytes is not None:
+        return audio_bytes
     
-    for attempt in range(max_retries):
-        try:
-            timeout = timeouts[attempt]
-            session = requests.Session()
-            response = session.get(download_url, stream=True, timeout=timeout)
-            
-            for key, value in response.cookies.items():
-                if key.startswith('download_warning'):
-                    params = {'confirm': value, 'id': file_id}
-                    response = session.get(download_url, params=params, stream=True, timeout=timeout)
-                    break
-            
-            audio_bytes = b''
-            chunk_size = 8192
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    audio_bytes += chunk
-            
-            audio_base64 = base64.b64encode(audio_bytes).decode()
-            return audio_base64
-            
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                st.warning(f"Download timed out, retrying... (attempt {attempt + 2}/{max_retries})")
-                continue
-            else:
-                st.error(f"Failed to download audio after {max_retries} attempts.")
-                return None
-        except Exception as e:
-            st.error(f"Error downloading audio: {e}")
-            return None
+    audio_bytes = take_prefetched_audio(file_id)
+    if audio_bytes:
+        store_cached_audio(file_id, audio_bytes)
+        return audio_bytes
     
-    return None
+    try:
+        audio_bytes = fetch_drive_audio(get_http_session(), file_id)
+        store_cached_audio(file_id, audio_bytes)
+        return audio_bytes
+    except requests.exceptions.Timeout:
+        st.error("Failed to download audio: request timed out.")
+        return None
+    except Exception as e:
+        st.error(f"Error downloading audio: {e}")
+        return None
+
+def get_cached_audio(file_id):
+    """Bytes from the per-session audio cache (marking them recently used), or None"""
+    # Per-session cache keyed by Drive file ID: a rerun gets the same bytes object back
+    # instead of st.cache_data's copy of a multi-MB payload
+    audio_cache = st.session_state.setdefault('audio_cache', OrderedDict())
+    if file_id not in audio_cache:
+        return None
+    audio_cache.move_to_end(file_id)
+    return audio_cache[file_id]
+
+def store_cached_audio(file_id, audio_bytes):
+    """Add a recording to the per-session audio cache, evicting the least recently used past AUDIO_CACHE_SIZE"""
+    audio_cache = st.session_state.setdefault('audio_cache', OrderedDict())
+    audio_cache[file_id] = audio_bytes
+    audio_cache.move_to_end(file_id)
+    while len(audio_cache) > AUDIO_CACHE_SIZE:
+        audio_cache.popitem(last=False)
+
+def try_fetch_drive_audio(session, file_id):
+    """fetch_drive_audio for the prefetch pool; failures are left for the on-demand path to report"""
+    try:
+        return fetch_drive_audio(session, file_id)
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Long-lived worker pool for background audio prefetch, shared across sessions"""
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+
+def prefetch_audio(drive_urls):
+    """Start background downloads of not-yet-cached Drive audio; cards collect them when opened"""
+    file_ids = dict.fromkeys(extract_drive_file_id(url) for url in drive_urls if 'drive.google.com' in url)
+    file_ids = [file_id for file_id in file_ids if file_id and get_cached_audio(file_id) is None]
+    
+    # Only the current cards' downloads are kept, so a session holds at most PREFETCH_CARDS;
+    # ones still queued for an earlier agent/period are cancelled
+    pending = st.session_state.setdefault('audio_prefetch', {})
+    for file_id in [file_id for file_id in pending if file_id not in file_ids]:
+        pending.pop(file_id).cancel()
+    
+    # Submitting returns at once, so cards render while the downloads run. The session is
+    # resolved here on the script thread; workers never touch st.* or session_state
+    session = get_http_session()
+    executor = get_prefetch_executor()
+    for file_id in file_ids:
+        if file_id not in pending:
+            pending[file_id] = executor.submit(try_fetch_drive_audio, session, file_id)
+
+def take_prefetched_audio(file_id):
+    """Bytes from a background prefetch of file_id, waiting only for that download; None if there was none or it failed"""
+    future = st.session_state.get('audio_prefetch', {}).pop(file_id, None)
+    return future.result() if future is not None else None
 
 # ---------- LOAD DATA ----------
 @st.cache_data(ttl=60)
 def load_data():
     """Load data from Google Sheets"""
     try:
-        df = pd.read_csv(SHEET_URL)
-        df['feedback_parsed'] = df['feedback_json'].apply(parse_feedback)
-        return df
+        response = requests.get(SHEET_URL, timeout=60)
+        response.raise_for_status()
+        # Arrow's multithreaded columnar reader; text columns stay strings even when a sheet
+        # column is empty or looks numeric, so the string ops below never see another type.
+        # Transcripts and feedback are quoted multi-line cells, which Arrow only splits correctly
+        # (across its parallel blocks) when told values may contain newlines
+        table = pa_csv.read_csv(
+            io.BytesIO(response.content),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={column: pa.string() for column in TEXT_COLUMNS},
+                strings_can_be_null=True
+            )
+        )
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        df.attrs['source_columns'] = list(df.columns)
+        df.attrs['fingerprint'] = xxhash.xxh3_64_intdigest(response.content)
+        # ISO dates are filtered as plain strings; anything else is parsed once per load
+        try:
+            df.attrs['iso_dates'] = is_iso_dates(df['date'])
+            if not df.attrs['iso_dates']:
+                df['date_parsed'] = pd.to_datetime(df['date'], errors='coerce')
+        except (KeyError, ValueError, TypeError):
+            pass  # No usable date column - time filter leaves data unfiltered
+        # Parsed dicts only live long enough to be flattened; everything downstream reads flat columns
+        feedback = parse_feedback_column(df['feedback_json'])
+        df['has_feedback'] = feedback.map(bool)
+        df = flatten_feedback(df, feedback)
+        # Numeric once here; every score reduction filters on score > 0. Kept float64: float32
+        # means round one-decimal averages differently and can drop an agent below a tier threshold
+        df['overall_score'] = pd.to_numeric(df['call_score_overall_score'], errors='coerce')
+        df[SCORE_COLUMNS] = df[SCORE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+        # Lowercased once per load and kept as an Arrow string column, so a keyword search is one match_substring scan
+        df['transcript_lower'] = df['transcript'].fillna('').str.lower()
+        df['strength_texts'] = feedback_item_texts(df['what_went_well'])
+        df['weakness_texts'] = feedback_item_texts(df['opportunities_to_improve'])
+        return add_card_columns(df)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
+def clean_feedback_str(feedback_str):
+    """Strip whitespace and any ```json code fence around a feedback string"""
+    clean_str = feedback_str.strip()
+    if clean_str.startswith('```'):
+        clean_str = clean_str.split('```')[1]
+        if clean_str.startswith('json'):
+            clean_str = clean_str[4:]
+    return clean_str.strip()
+
+def conform_feedback(feedback):
+    """Coerce a parsed document to the shape the dashboard reads: a dict, with call_score only if it is a dict"""
+    if not isinstance(feedback, dict):
+        return {}
+    if 'call_score' in feedback and not isinstance(feedback['call_score'], dict):
+        return {key: value for key, value in feedback.items() if key != 'call_score'}
+    return feedback
+
 def parse_feedback(feedback_str):
     """Parse feedback JSON string"""
-    if pd.isna(feedback_str) or not feedback_str:
+    if not isinstance(feedback_str, str) or not feedback_str:
         return {}
     try:
-        clean_str = feedback_str.strip()
-        if clean_str.startswith('```'):
-            clean_str = clean_str.split('```')[1]
-            if clean_str.startswith('json'):
-                clean_str = clean_str[4:]
-        clean_str = clean_str.strip()
-        return json.loads(clean_str)
-    except:
+        return conform_feedback(orjson.loads(clean_feedback_str(feedback_str)))
+    except orjson.JSONDecodeError:
         return {}
 
-def filter_by_time_period(df, time_filter):
-    """Filter dataframe by selected time period"""
-    if df.empty or 'date' not in df.columns:
-        return df
+def parse_feedback_column(feedback_json):
+    """Parse a column of feedback strings: memo hits first, then every new document in one orjson call"""
+    memo = get_feedback_memo()
+    parsed = {}
+    cleaned = {}
+    for feedback_str in feedback_json:
+        if not isinstance(feedback_str, str) or not feedback_str or feedback_str in parsed or feedback_str in cleaned:
+            continue
+        if feedback_str in memo:
+            parsed[feedback_str] = memo[feedback_str]
+        else:
+            cleaned[feedback_str] = clean_feedback_str(feedback_str)
     
-    # Convert date column to datetime if it isn't already
+    documents = [clean_str for clean_str in cleaned.values() if clean_str]
     try:
-        df['date_parsed'] = pd.to_datetime(df['date'], errors='coerce')
-    except:
-        return df  # If date parsing fails, return unfiltered
+        parsed_docs = orjson.loads(('[' + ','.join(documents) + ']').encode())
+    except orjson.JSONDecodeError:
+        parsed_docs = None
+    
+    if parsed_docs is not None and len(parsed_docs) == len(documents):
+        parsed_iter = iter(parsed_docs)
+        for raw, clean_str in cleaned.items():
+            parsed[raw] = conform_feedback(next(parsed_iter)) if clean_str else {}
+    else:
+        # A malformed row poisons the batch; parse the new rows one by one so only that row comes back empty
+        for raw in cleaned:
+            parsed[raw] = parse_feedback(raw)
+    
+    # Keep only this sheet's documents, so edited or deleted rows don't accumulate across reloads
+    memo.clear()
+    memo.update(parsed)
+    return feedback_json.map(lambda feedback_str: parsed.get(feedback_str, {}) if isinstance(feedback_str, str) else {})
+
+@st.cache_resource
+def get_feedback_memo():
+    """Parsed feedback keyed on the raw string - kept across reruns so each reload only parses new or edited rows"""
+    return {}
+
+def flatten_feedback(df, feedback):
+    """Join the parsed feedback dicts onto df as flat columns (call_outcome, call_score_overall, ...)"""
+    # The parser guarantees one dict per row, so this goes straight to json_normalize
+    flat = pd.json_normalize(feedback.tolist(), max_level=1, sep='_')
+    flat.index = df.index
+    # Every field the dashboard reads exists even if no call has it yet
+    flat = flat.reindex(columns=flat.columns.union(FEEDBACK_COLUMNS, sort=False))
+    flat_df = df.join(flat.drop(columns=df.columns, errors='ignore'))
+    flat_df.attrs = df.attrs  # join() drops attrs, and fingerprint_df needs source_columns
+    return flat_df
+
+def add_card_columns(df):
+    """Fill the fields the Rep Deep Dive call cards read, so rendering a card is pure formatting"""
+    for column in ('summary', 'customer_intent', 'close_reason', 'transcript'):
+        df[column] = df[column].fillna('')
+    for column in CARD_LIST_COLUMNS:
+        df[column] = df[column].map(lambda items: items if isinstance(items, list) else [])
+    if 'audio_url' in df:
+        df['has_audio'] = (df['audio_url'].notna() & df['audio_url'].ne('')).fillna(False)
+    else:
+        df['has_audio'] = False
+    df['outcome'] = df['call_outcome'].where(df['call_outcome'].map(lambda value: isinstance(value, str)), 'unknown')
+    df['outcome_icon'] = df['outcome'].map(OUTCOME_ICONS).fillna("⚪")
+    # Every piece as plain object strings, so an empty sheet or one without a date column still concatenates
+    date = df['date'].astype(object).map(str).astype(object) if 'date' in df else 'N/A'
+    df['card_title'] = (df['outcome_icon'].astype(object) + " " + df['filename'].astype(object).map(str).astype(object)
+                        + " - " + df['outcome'].astype(object).str.upper() + " (" + date + ")")
+    if 'disposition' in df:
+        df['reached_cc'] = df['disposition'].fillna('').str.contains('credit card', case=False, regex=False)
+    else:
+        df['reached_cc'] = False
+    return with_first_seen_categories(df)
+
+def with_first_seen_categories(df):
+    """Recode agent_name and outcome as categoricals of just the values in df, in first-seen order"""
+    # Integer codes make groupbys, bincounts and == masks cheap; first-seen categories keep
+    # sort=False and tie order following the rows of this (possibly filtered) frame
+    return df.assign(**{
+        column: df[column].astype(pd.CategoricalDtype(df[column].dropna().unique().tolist()))
+        for column in ('agent_name', 'outcome')
+    })
+
+def is_iso_dates(dates):
+    """True when every non-empty date starts with an ISO 8601 YYYY-MM-DD prefix"""
+    return bool(dates.dropna().str.match(ISO_DATE_PATTERN).all())
+
+def filter_by_time_period(df, time_filter):
+    """Filter dataframe by selected time period"""
+    if df.empty or time_filter not in ("Today", "This Week", "This Month"):
+        return df  # All Time
     
     now = datetime.now()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     
     if time_filter == "Today":
-        filtered = df[df['date_parsed'] >= today_start]
+        period_start = today_start
     elif time_filter == "This Week":
-        week_start = today_start - timedelta(days=today_start.weekday())
-        filtered = df[df['date_parsed'] >= week_start]
-    elif time_filter == "This Month":
-        month_start = today_start.replace(day=1)
-        filtered = df[df['date_parsed'] >= month_start]
-    else:  # All Time
-        filtered = df
-    
-    return filtered
+        period_start = today_start - timedelta(days=today_start.weekday())
+    else:  # This Month
+        period_start = today_start.replace(day=1)
+    
+    if df.attrs.get('iso_dates'):
+        # ISO 8601 strings sort chronologically, so a date-prefix string compare is exact
+        return df[df['date'] >= period_start.strftime('%Y-%m-%d')]
+    if 'date_parsed' in df.columns:
+        return df[df['date_parsed'] >= period_start]
+    return df  # No parseable dates, return unfiltered
+
+def explode_feedback_items(calls, column, defaults, tags=('date', 'filename')):
+    """One row per item of a list-valued feedback column, tagged with columns of the call it came from"""
+    items = calls[[*tags, column]].explode(column).dropna(subset=[column])
+    records = pd.json_normalize(items[column].tolist(), max_level=0)
+    records = records.reindex(columns=list(defaults)).fillna(defaults)
+    for tag in tags:
+        records[tag] = items[tag].to_numpy()
+    return records
+
+def feedback_item_text(item):
+    """Display text for a strength/weakness entry, which may be a plain string or a dict with 'text'"""
+    if isinstance(item, dict):
+        return item.get('text', str(item))
+    return str(item)
+
+def feedback_item_texts(column):
+    """Per-call list of display texts for a strength/weakness column, flattened once at load time"""
+    texts = column.explode().dropna().map(feedback_item_text)
+    return texts.groupby(level=0).agg(list).reindex(column.index)
+
+def is_truthy(values):
+    """Vectorized truthiness of a flattened feedback column (missing counts as False)"""
+    return values.notna() & values.astype(bool)
+
+def fingerprint_df(df):
+    """Cheap cache key for a calls DataFrame - the sheet's byte hash plus which rows survived filtering"""
+    if 'fingerprint' in df.attrs:
+        return xxhash.xxh3_64_intdigest(df.index.to_numpy().tobytes(), seed=df.attrs['fingerprint'])
+    # Frames built outside load_data: hash only the raw sheet columns, not the parsed dicts
+    source = df[df.attrs.get('source_columns', [])]
+    return int(pd.util.hash_pandas_object(source).sum())
 
+DF_HASH_FUNCS = {pd.DataFrame: fingerprint_df}
+
+@st.cache_data(ttl=60, hash_funcs=DF_HASH_FUNCS)
 def aggregate_rep_performance(df, agent_name):
     """Aggregate all performance data for a specific rep"""
     agent_calls = df[df['agent_name'] == agent_name]
+    reviewed = agent_calls[agent_calls['has_feedback']]
+    outcomes = reviewed['call_outcome']
+    spin_used = {
+        gap: is_truthy(reviewed[f'spin_analysis_{gap}_questions_used'])
+        for gap in ['situation', 'problem', 'implication', 'need_payoff']
+    }
     
     aggregated = {
         'total_calls': len(agent_calls),
-        'outcomes': {'closed': 0, 'lost': 0, 'follow_up': 0},
-        'scores': {
-            'overall': [],
-            'active_listening': [],
-            'probing_depth': [],
-            'emotional_intelligence': [],
-            'value_based_selling': [],
-            'spin_effectiveness': [],
-            'sandler_effectiveness': [],
-            'objection_handling': []
-        },
-        'common_strengths': [],
-        'common_weaknesses': [],
-        'active_listening_patterns': [],
-        'probing_patterns': [],
-        'emotional_cue_patterns': [],
-        'objection_patterns': [],
-        'spin_gaps': {
-            'situation': 0,
-            'problem': 0,
-            'implication': 0,
-            'need_payoff': 0
+        'outcomes': {
+            'closed': int((outcomes == 'closed').sum()),
+            'lost': int((outcomes == 'lost').sum()),
+            'follow_up': int(outcomes.isin(['follow-up-scheduled', 'needs-callback']).sum())
         },
+        'scores': {},
+        'common_strengths': reviewed['strength_texts'].explode().value_counts().head(5),
+        'common_weaknesses': reviewed['weakness_texts'].explode().value_counts().head(5),
+        'active_listening_patterns': explode_feedback_items(
+            reviewed, 'active_listening_failures', {'what_was_missed': ''}),
+        'probing_patterns': explode_feedback_items(
+            reviewed, 'missed_probing_opportunities', {}),
+        'emotional_cue_patterns': explode_feedback_items(
+            reviewed, 'emotional_cues_missed', {'customer_emotion': ''}),
+        'objection_patterns': explode_feedback_items(
+            reviewed, 'objection_handling_analysis',
+            {'objection': '', 'effectiveness_rating': 0, 'went_straight_to_discount': False}),
+        'spin_gaps': {gap: int((~used).sum()) for gap, used in spin_used.items()},
         'sandler_gaps': {
-            'upfront_contract': 0,
-            'pain_depth_surface': 0,
-            'budget_qualified': 0,
-            'decision_process': 0
+            'upfront_contract': int((~is_truthy(reviewed['sandler_analysis_upfront_contract_established'])).sum()),
+            'pain_depth_surface': int((reviewed['sandler_analysis_pain_depth'] == 'surface').sum()),
+            'budget_qualified': int((~is_truthy(reviewed['sandler_analysis_budget_qualified'])).sum()),
+            'decision_process': int((~is_truthy(reviewed['sandler_analysis_decision_process_identified'])).sum())
         }
     }
     
-    for _, row in agent_calls.iterrows():
-        feedback = row['feedback_parsed']
-        if not feedback:
-            continue
-        
-        # Outcomes
-        outcome = feedback.get('call_outcome', '')
-        if outcome == 'closed':
-            aggregated['outcomes']['closed'] += 1
-        elif outcome == 'lost':
-            aggregated['outcomes']['lost'] += 1
-        elif outcome in ['follow-up-scheduled', 'needs-callback']:
-            aggregated['outcomes']['follow_up'] += 1
-        
-        # Scores
-        call_scores = feedback.get('call_score', {})
-        for score_type in aggregated['scores'].keys():
-            score_value = call_scores.get(score_type, 0)
-            if score_value > 0:
-                aggregated['scores'][score_type].append(score_value)
-        
-        # Strengths and weaknesses
-        aggregated['common_strengths'].extend(feedback.get('what_went_well', []))
-        aggregated['common_weaknesses'].extend(feedback.get('opportunities_to_improve', []))
-        
-        # Active listening failures
-        listening_fails = feedback.get('active_listening_failures', [])
-        for fail in listening_fails:
-            aggregated['active_listening_patterns'].append({
-                'what_was_missed': fail.get('what_was_missed', ''),
-                'date': row['date'],
-                'filename': row['filename']
-            })
-        
-        # Probing opportunities
-        probing_misses = feedback.get('missed_probing_opportunities', [])
-        for miss in probing_misses:
-            aggregated['probing_patterns'].append({
-                'pattern': 'Stopped at surface level',
-                'date': row['date'],
-                'filename': row['filename']
-            })
+    # Average score per skill in one column-wise mean (missing or zero scores are ignored)
+    scores = reviewed[SCORE_COLUMNS]
+    score_means = scores.where(scores > 0).mean().fillna(0)
+    aggregated['scores'] = {
+        score_type: float(score_means[column]) for score_type, column in zip(SCORE_TYPES, SCORE_COLUMNS)
+    }
+    
+    return aggregated
+
+@st.cache_data(ttl=60, hash_funcs=DF_HASH_FUNCS)
+def compute_team_stats(df):
+    """Per-agent coaching stats and shareworthy-moment counts for the Executive Summary"""
+    reviewed_calls = df[df['has_feedback']]
+    
+    team_issues = {
+        'active_listening': [],
+        'probing': [],
+        'emotional_cues': [],
+        'objections': [],
+        'went_to_discount': []
+    }
+    
+    agent_performance = {}
+    
+    # One pass to build the group index instead of a full-table mask per agent
+    for agent, agent_calls in df.groupby('agent_name', sort=False, observed=True):
+        reviewed = agent_calls[agent_calls['has_feedback']]
         
-        # Emotional cues
-        emotional_misses = feedback.get('emotional_cues_missed', [])
-        for miss in emotional_misses:
-            aggregated['emotional_cue_patterns'].append({
-                'emotion': miss.get('customer_emotion', ''),
-                'date': row['date'],
-                'filename': row['filename']
-            })
+        objections = explode_feedback_items(
+            reviewed, 'objection_handling_analysis', {'went_straight_to_discount': False})
+        discount_count = int(is_truthy(objections['went_straight_to_discount']).sum())
+        team_issues['went_to_discount'].extend([agent] * discount_count)
         
-        # Objections
-        objections = feedback.get('objection_handling_analysis', [])
-        for obj in objections:
-            aggregated['objection_patterns'].append({
-                'objection': obj.get('objection', ''),
-                'effectiveness': obj.get('effectiveness_rating', 0),
-                'went_to_discount': obj.get('went_straight_to_discount', False),
-                'date': row['date'],
-                'filename': row['filename']
-            })
+        moments = explode_feedback_items(reviewed, 'exceptional_moments', {'shareworthy': False})
         
-        # SPIN gaps
-        spin = feedback.get('spin_analysis', {})
-        if not spin.get('situation_questions_used'):
-            aggregated['spin_gaps']['situation'] += 1
-        if not spin.get('problem_questions_used'):
-            aggregated['spin_gaps']['problem'] += 1
-        if not spin.get('implication_questions_used'):
-            aggregated['spin_gaps']['implication'] += 1
-        if not spin.get('need_payoff_questions_used'):
-            aggregated['spin_gaps']['need_payoff'] += 1
+        scores = reviewed['overall_score']
+        scores = scores[scores > 0]
         
-        # Sandler gaps
-        sandler = feedback.get('sandler_analysis', {})
-        if not sandler.get('upfront_contract_established'):
-            aggregated['sandler_gaps']['upfront_contract'] += 1
-        if sandler.get('pain_depth') == 'surface':
-            aggregated['sandler_gaps']['pain_depth_surface'] += 1
-        if not sandler.get('budget_qualified'):
-            aggregated['sandler_gaps']['budget_qualified'] += 1
-        if not sandler.get('decision_process_identified'):
-            aggregated['sandler_gaps']['decision_process'] += 1
+        agent_performance[agent] = {
+            'total_calls': len(agent_calls),
+            'listening_fails': int(reviewed['active_listening_failures'].str.len().sum()),
+            'probing_fails': int(reviewed['missed_probing_opportunities'].str.len().sum()),
+            'emotional_fails': int(reviewed['emotional_cues_missed'].str.len().sum()),
+            'objection_fails': len(objections),
+            'discount_count': discount_count,
+            'exceptional_count': int(is_truthy(moments['shareworthy']).sum()),
+            'avg_score': float(scores.mean()) if not scores.empty else 0
+        }
     
-    return aggregated
+    exceptional_by_category = {
+        'objection_handling': {},
+        'empathy': {},
+        'active_listening': {},
+        'probing': {}
+    }
+    
+    moments = explode_feedback_items(
+        reviewed_calls, 'exceptional_moments', {'shareworthy': False, 'category': 'general'},
+        tags=['agent_name'])
+    shareworthy = moments[is_truthy(moments['shareworthy'])]
+    for category in exceptional_by_category:
+        category_agents = shareworthy.loc[shareworthy['category'] == category, 'agent_name']
+        agent_counts = category_agents.value_counts(sort=False)
+        exceptional_by_category[category] = agent_counts[agent_counts > 0].to_dict()
+    
+    return agent_performance, team_issues, exceptional_by_category
+
+@st.cache_data(ttl=60, hash_funcs=DF_HASH_FUNCS)
+def collect_exceptional_calls(df):
+    """Calls with at least one shareworthy exceptional moment, in sheet order, for the Exceptional Moments feed"""
+    moments = df.loc[df['has_feedback'], 'exceptional_moments'].explode().dropna()
+    shareworthy = moments[moments.map(lambda moment: bool(moment.get('shareworthy')))]
+    
+    exceptional_calls = []
+    for idx, call_moments in shareworthy.groupby(level=0, sort=False):
+        exceptional_calls.append({
+            'agent_name': df.at[idx, 'agent_name'],
+            'filename': df.at[idx, 'filename'],
+            'date': df.at[idx, 'date'],
+            'call_outcome': df.at[idx, 'outcome'],
+            'moments': call_moments.tolist()
+        })
+    return exceptional_calls
+
+@st.cache_data(ttl=60, hash_funcs=DF_HASH_FUNCS)
+def compute_team_totals(df):
+    """Team-wide closed/lost counts and average overall score for Team Analytics"""
+    all_scores = df.loc[df['overall_score'] > 0, 'overall_score']
+    
+    # One pass over the outcome codes tallies every outcome at once
+    codes = df['outcome'].cat.codes.to_numpy()
+    categories = df['outcome'].cat.categories
+    outcome_counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(categories)), index=categories)
+    closed = int(outcome_counts.get('closed', 0))
+    lost = int(outcome_counts.get('lost', 0))
+    avg_score = float(all_scores.mean()) if not all_scores.empty else 0
+    return closed, lost, avg_score
+
+@st.cache_data(ttl=60, hash_funcs=DF_HASH_FUNCS)
+def build_leaderboard(df):
+    """Per-agent calls, close rate, average score and W/L for the Team Analytics leaderboard"""
+    # Per-agent totals as bincounts over the agent category codes (-1, no agent, is left out)
+    agent_codes = df['agent_name'].cat.codes.to_numpy()
+    has_agent = agent_codes >= 0
+    agent_codes = agent_codes[has_agent]
+    agents = df['agent_name'].cat.categories
+    n_agents = len(agents)
+    
+    calls = np.bincount(agent_codes, minlength=n_agents)
+    observed = calls > 0
+    if not observed.any():
+        return pd.DataFrame()
+    
+    scores = df['overall_score'].to_numpy()[has_agent]
+    scored = scores > 0
+    # == on a categorical compares integer codes
+    closed = np.bincount(agent_codes, weights=df['outcome'].eq('closed').to_numpy()[has_agent], minlength=n_agents).astype(int)
+    lost = np.bincount(agent_codes, weights=df['outcome'].eq('lost').to_numpy()[has_agent], minlength=n_agents).astype(int)
+    score_count = np.bincount(agent_codes, weights=scored, minlength=n_agents)
+    score_sum = np.bincount(agent_codes, weights=np.where(scored, scores, 0), minlength=n_agents)
+    
+    total = closed + lost
+    close_rate = np.divide(closed * 100, total, out=np.zeros(n_agents), where=total > 0)
+    avg_score = np.divide(score_sum, score_count, out=np.zeros(n_agents), where=score_count > 0)
+    leaderboard_df = pd.DataFrame({
+        'Agent': pd.Categorical(agents[observed]),
+        'Calls': calls[observed],
+        'Close Rate': close_rate[observed],
+        'Avg Score': avg_score[observed],
+        'Closed': closed[observed],
+        'Lost': lost[observed]
+    })
+    return leaderboard_df.sort_values('Close Rate', ascending=False, kind='stable')
+
+# ---------- DISPLAY HELPERS ----------
+JUMP_BUTTON_TEMPLATE = (
+    '<button onclick="var p = window.parent.document.querySelector(\'.st-key-{player_id} audio\'); '
+    'if (p) {{ p.currentTime = {seconds}; p.play(); p.scrollIntoView({{behavior: \'smooth\', block: \'center\'}}); }}" '
+    'style="display:block; margin-bottom:8px; padding:10px 20px; background:#4CAF50; color:white; '
+    'border:none; border-radius:5px; cursor:pointer; font-weight:bold;">▶ Jump to {label}</button>'
+)
+
+@lru_cache(maxsize=4096)
+def ts_to_seconds(ts):
+    """Seconds into the call for a 'MM:SS', 'HH:MM:SS' or plain-seconds timestamp (0 if unparseable)"""
+    try:
+        if ':' not in ts:
+            return int(float(ts))
+        parts = [int(part) for part in ts.split(':')]
+    except (ValueError, OverflowError):
+        return 0
+    if len(parts) == 2:
+        return parts[0] * 60 + parts[1]
+    if len(parts) == 3:
+        return parts[0] * 3600 + parts[1] * 60 + parts[2]
+    return 0
+
+SCORE_COLUMN = st.column_config.NumberColumn("Score", format="%.1f/10")
+# Leaderboard numbers stay numeric so the table sorts by value, not by formatted string
+LEADERBOARD_COLUMNS = {
+    'Close Rate': st.column_config.ProgressColumn("Close Rate", format="%.1f%%", min_value=0, max_value=100),
+    'Avg Score': st.column_config.NumberColumn("Avg Score", format="%.1f/10")
+}
+
+def render_jump_buttons(player_id, timestamps):
+    """All of a section's jump-to-timestamp buttons in one iframe instead of one iframe per moment"""
+    buttons = [
+        JUMP_BUTTON_TEMPLATE.format(player_id=player_id, seconds=ts_to_seconds(str(ts)), label=html.escape(str(ts)))
+        for ts in timestamps
+    ]
+    # st.markdown and st.html both strip onclick handlers, so the buttons still need an iframe;
+    # height="content" sizes it to the buttons instead of a per-button guess
+    st.iframe(
+        f'<div style="padding:10px; background:#f0f8ff; border-radius:5px;">{"".join(buttons)}</div>',
+        height="content"
+    )
+
+def show_table(rows, columns, **column_config):
+    """Render a list of rows as one dataframe instead of a Streamlit element per row"""
+    st.dataframe(pd.DataFrame(rows, columns=columns), width="stretch", hide_index=True,
+                 column_config=column_config or None)
+
+# ---------- COACHING MOMENT HTML ----------
+# Streamlit's alert palette, so one st.markdown blob per moment looks like the st.info/success/... calls it replaces
+CALLOUT_STYLES = {
+    'info': ('#d1ecf1', '#0c5460'),
+    'success': ('#d4edda', '#155724'),
+    'warning': ('#fff3cd', '#856404'),
+    'error': ('#f8d7da', '#721c24'),
+}
+
+# (callout kind, message) per rep_acknowledgment_level; anything else counts as not acknowledged
+ACK_CALLOUTS = {
+    'full': ('success', "✅ Rep fully acknowledged this emotion"),
+    'partial': ('warning', "⚠️ Rep partially acknowledged this emotion"),
+}
+NO_ACK_CALLOUT = ('error', "❌ Rep did not acknowledge this emotion")
+
+def esc(value):
+    """HTML-escape a feedback value for embedding in a moment blob"""
+    return html.escape(str(value))
+
+def callout(kind, text, label=''):
+    """An st.info/st.success/st.warning/st.error lookalike div; label is bold, text is escaped"""
+    background, color = CALLOUT_STYLES[kind]
+    bold = f"<b>{label}</b> " if label else ''
+    return (f'<div style="background:{background}; color:{color}; padding:12px 16px; '
+            f'border-radius:8px; margin-bottom:12px;">{bold}{esc(text)}</div>')
+
+def caption_html(text):
+    """An st.caption lookalike paragraph"""
+    return f'<p style="color:#808495; font-size:0.875rem; margin-bottom:12px;">{esc(text)}</p>'
+
+def columns_html(*columns):
+    """Side-by-side equal-width columns, like st.columns"""
+    cells = ''.join(f'<div style="flex:1; min-width:0;">{"".join(column)}</div>' for column in columns)
+    return f'<div style="display:flex; gap:1rem;">{cells}</div>'
+
+def is_filled(value, blanks=('none', '')):
+    """True for a feedback string with real content (not empty or a 'none'-style placeholder)"""
+    return bool(value) and value.lower() not in blanks
+
+def field_html(label, value):
+    """A bold-label paragraph, like st.write(f"**{label}:** {value}")"""
+    return f"<p><b>{label}:</b> {esc(value)}</p>"
+
+def render_call_overview_html(row):
+    """The three-column summary at the top of a call card as a single HTML string"""
+    outcome_col = []
+    if pd.notna(row.overall_score):
+        outcome_col.append(field_html("Overall Score", f"{row.overall_score:g}/10"))
+    outcome_col.append(field_html("Close Reason", row.close_reason))
+    
+    call_col = []
+    disposition = getattr(row, 'disposition', 'Unknown')
+    if pd.notna(disposition):
+        call_col.append(field_html("Five9 Disposition", disposition))
+        if row.reached_cc:
+            call_col.append(callout('success', "💳 Reached Credit Card Stage!"))
+    call_col.append(field_html("Call Duration", f"{getattr(row, 'call_duration', 'N/A')}s"))
+    
+    return columns_html(
+        [field_html("Summary", row.summary), field_html("Customer Intent", row.customer_intent)],
+        outcome_col,
+        call_col
+    )
+
+def render_went_well_html(went_well, opportunities):
+    """The card's What Went Well / Opportunities to Improve columns as a single HTML string"""
+    went_well_col = ["<h3>💚 What Went Well</h3>"]
+    went_well_col += [callout('success', f"✓ {item}") for item in went_well] or [callout('info', "Building feedback...")]
+    opportunities_col = ["<h3>📈 Opportunities to Improve</h3>"]
+    opportunities_col += [callout('warning', f"⚠️ {item}") for item in opportunities] or [callout('info', "Building feedback...")]
+    return columns_html(went_well_col, opportunities_col)
+
+def render_listening_moment_html(fail, number):
+    """One active listening coaching moment as a single HTML string"""
+    get = fail.get
+    ts = get('timestamp', 'N/A')
+    customer_said = get('customer_said', 'N/A')
+    rep_response = get('rep_response', 'N/A')
+    rep_attempted = get('what_rep_attempted', '')
+    what_worked = get('what_worked', '')
+    what_missed = get('what_was_missed', 'N/A')
+    why_matters = get('why_it_matters', '')
+    better = get('better_response', 'N/A')
+    framework = get('framework_connection', '')
+    
+    parts = [
+        f"<h4>📍 Moment {number} - Timestamp: {esc(ts)}</h4>",
+        "<p><b>🗣️ What Was Said:</b></p>",
+        columns_html(
+            [callout('info', f"\"{customer_said}\"", "Customer:")],
+            [callout('warning', f"\"{rep_response}\"", "Rep:")]
+        ),
+        "<p><b>📊 Coaching Analysis:</b></p>",
+    ]
+    if is_filled(rep_attempted, ('none', 'nothing', '')):
+        parts.append(callout('success', rep_attempted, "✓ Rep Attempted:"))
+    if is_filled(what_worked):
+        parts.append(callout('success', what_worked, "✓ What Worked:"))
+    parts.append(callout('error', what_missed, "❌ What Was Missed:"))
+    if why_matters:
+        parts.append(callout('warning', why_matters, "⚠️ Why It Matters:"))
+    parts.append("<p><b>💡 Better Response:</b></p>")
+    parts.append(callout('success', f"\"{better}\""))
+    if framework:
+        parts.append(callout('info', framework, "🎓 Framework:"))
+    parts.append("<hr>")
+    return ''.join(parts)
+
+def render_probing_moment_html(miss, number):
+    """One missed probing opportunity as a single HTML string"""
+    get = miss.get
+    ts = get('timestamp', 'N/A')
+    surface_answer = get('surface_answer', 'N/A')
+    what_did = get('what_rep_did_instead', '')
+    why_hurts = get('why_stopping_hurts', '')
+    should_have_asked = get('should_have_asked', 'N/A')
+    why_works = get('why_this_question_works', '')
+    framework = get('framework_connection', '')
+    
+    happened = [
+        "<p><b>What Happened:</b></p>",
+        callout('info', f"\"{surface_answer}\"", "Customer's Surface Answer:"),
+    ]
+    if what_did:
+        happened.append(callout('warning', what_did, "Rep Did Instead:"))
+    else:
+        happened.append(callout('warning', '', "Rep moved on without digging deeper"))
+    if why_hurts:
+        happened.append(callout('error', why_hurts, "Cost of Stopping:"))
+    
+    better = [
+        "<p><b>💡 Should Have Asked:</b></p>",
+        callout('success', f"\"{should_have_asked}\""),
+    ]
+    if why_works:
+        better.append(callout('info', why_works, "Why This Works:"))
+    if framework:
+        better.append(callout('info', framework, "🎓 Framework:"))
+    
+    return (f"<h4>📍 Opportunity {number} - Timestamp: {esc(ts)}</h4>"
+            + columns_html(happened, better) + "<hr>")
+
+def render_emotion_moment_html(miss):
+    """One missed emotional cue as a single HTML string"""
+    get = miss.get
+    ts = get('timestamp', 'N/A')
+    emotion = get('customer_emotion', '')
+    ack_level = get('rep_acknowledgment_level', 'none')
+    signal = get('signal', 'N/A')
+    rep_attempted = get('rep_attempted', '')
+    what_worked = get('what_worked', '')
+    rep_missed = get('rep_missed_it', '')
+    why_matters = get('why_it_matters', '')
+    empathy_response = get('empathy_response', 'N/A')
+    framework = get('framework_connection', '')
+    
+    ack = callout(*ACK_CALLOUTS.get(ack_level, NO_ACK_CALLOUT))
+    
+    happened = [
+        "<p><b>What Happened:</b></p>",
+        callout('info', signal, "Emotional Signal:"),
+    ]
+    if is_filled(rep_attempted):
+        happened.append(callout('warning', rep_attempted, "Rep Said:"))
+        if is_filled(what_worked):
+            happened.append(callout('success', what_worked, "✓ What Worked:"))
+    if rep_missed:
+        happened.append(callout('error', rep_missed, "❌ What Was Missed:"))
+    if why_matters:
+        happened.append(callout('warning', why_matters, "⚠️ Impact:"))
+    
+    better = [
+        "<p><b>💡 Complete Empathy Response:</b></p>",
+        callout('success', f"\"{empathy_response}\""),
+    ]
+    if framework:
+        better.append(callout('info', framework, "🎓 Framework:"))
+    
+    icon = EMOTION_ICONS.get(emotion, "💭")
+    return (f"<h4>{icon} {esc(emotion.title())} - Timestamp: {esc(ts)}</h4>"
+            + ack + columns_html(happened, better) + "<hr>")
+
+def render_objection_moment_html(obj, number):
+    """One objection handling analysis as a single HTML string"""
+    get = obj.get
+    effectiveness = get('effectiveness_rating', 0)
+    rep_attempted = get('rep_attempted', '')
+    what_worked = get('what_worked', '')
+    technique = get('sandler_technique_recommended', '')
+    why_tech = get('why_this_technique', '')
+    frameworks = get('framework_connections', '')
+    
+    color = "🟢" if effectiveness >= 7 else "🟡" if effectiveness >= 4 else "🔴"
+    parts = [
+        f"<h4>{color} Objection {number}: \"{esc(get('objection', ''))}\"</h4>",
+        caption_html(f"Effectiveness: {effectiveness}/10 | Timestamp: {get('timestamp', 'N/A')}"),
+        "<p><b>🎯 The Real Issue:</b></p>",
+        callout('info', get('real_objection', 'Unknown')),
+        "<hr>",
+    ]
+    
+    happened = [
+        "<p><b>📋 What Happened:</b></p>",
+        callout('warning', f"\"{get('rep_response', 'N/A')}\"", "Rep's Response:"),
+    ]
+    if is_filled(rep_attempted):
+        happened.append(callout('info', rep_attempted, "Rep Attempted:"))
+    if what_worked and what_worked.lower() not in ['none', 'nothing']:
+        happened.append(callout('success', what_worked, "✓ What Worked:"))
+    
+    failures = ["<p><b>❌ Critical Failures:</b></p>"]
+    failures += [callout('error', f"• {failure}") for failure in get('critical_failures', [])]
+    if get('went_straight_to_discount'):
+        failures.append(callout('error', '', "💰 Jumped straight to discount!"))
+    if not get('value_established'):
+        failures.append(callout('error', '', "⚠️ Value was NOT established first"))
+    
+    parts += [columns_html(happened, failures), "<hr>", "<p><b>💡 Step-by-Step Better Approach:</b></p>"]
+    for step in get('step_by_step_better_approach', []):
+        why = step.get('why', '')
+        parts.append(f"<p><b>Step {esc(step.get('step', ''))}: {esc(step.get('action', ''))}</b></p>")
+        parts.append(callout('success', f"💬 \"{step.get('example', '')}\""))
+        if why:
+            parts.append(caption_html(f"📖 {why}"))
+    
+    technique_col = []
+    if technique:
+        technique_col.append(callout('info', technique, "Sandler Technique:"))
+    if why_tech:
+        technique_col.append(caption_html(f"💡 {why_tech}"))
+    principles_col = []
+    if frameworks:
+        principles_col.append(callout('info', frameworks, "Framework Principles:"))
+    
+    parts += ["<p><b>🎓 Framework Recommendation:</b></p>", columns_html(technique_col, principles_col), "<hr>"]
+    return ''.join(parts)
+
+# ---------- REP CALL CARDS ----------
+@st.fragment
+def render_call_cards(agent_calls, prefetch_key):
+    """Render the Rep Deep Dive call cards; opening a card or section reruns only this fragment"""
+    # Start background downloads for the first few cards once per agent/period; later cards download when opened
+    if 'audio_url' in agent_calls and st.session_state.get('audio_prefetch_key') != prefetch_key:
+        prefetch_audio(agent_calls.loc[agent_calls['has_audio'], 'audio_url'].head(PREFETCH_CARDS))
+        st.session_state['audio_prefetch_key'] = prefetch_key
+    
+    for row in agent_calls.itertuples():
+        idx = row.Index
+        
+        # Stateful expanders rerun on toggle, so a card's body is only built while it is open
+        call_expander = st.expander(row.card_title, key=f"rep_call_{idx}", on_change="rerun")
+        with call_expander:
+            if call_expander.open:
+                st.markdown(render_call_overview_html(row), unsafe_allow_html=True)
+                
+                st.markdown("---")
+                
+                # ==== LOAD AUDIO PLAYER FIRST ====
+                audio_available = False
+                player_id = None
+                
+                if row.has_audio:
+                    audio_available = True
+                    google_drive_url = row.audio_url
+                    
+                    if 'drive.google.com' in google_drive_url:
+                        with st.spinner("🎧 Loading audio player..."):
+                            audio_bytes = download_audio_from_gdrive(google_drive_url, row.filename)
+                        
+                        if audio_bytes:
+                            # st.audio serves the bytes from a media URL the browser caches, instead of
+                            # re-sending a multi-MB base64 data URL; the keyed container lets jump buttons find it
+                            player_id = f"audio_{idx}"
+                            with st.container(key=player_id, border=True):
+                                st.markdown("**🎧 Master Audio Player** - Use timestamp buttons below to jump to specific moments")
+                                st.audio(audio_bytes, format='audio/wav')
+                            st.success("✅ Audio loaded! Click '▶ Jump to...' buttons below.")
+                
+                st.markdown("---")
+                
+                st.subheader("🎯 Coaching Breakdown")
+                
+                # === ACTIVE LISTENING ===
+                listening_fails = row.active_listening_failures
+                if listening_fails:
+                    section = st.expander(f"🎧 Active Listening - Coaching Moments ({len(listening_fails)})", key=f"rep_call_{idx}_listening", on_change="rerun")
+                    with section:
+                        if section.open:
+                            if audio_available and player_id:
+                                render_jump_buttons(player_id, [moment.get('timestamp', '00:00') for moment in listening_fails])
+                            
+                            for fail_idx, fail in enumerate(listening_fails):
+                                st.markdown(render_listening_moment_html(fail, fail_idx + 1), unsafe_allow_html=True)
+                
+                # === PROBING ===
+                probing_misses = row.missed_probing_opportunities
+                if probing_misses:
+                    section = st.expander(f"🔍 Missed Probing Opportunities ({len(probing_misses)})", key=f"rep_call_{idx}_probing", on_change="rerun")
+                    with section:
+                        if section.open:
+                            if audio_available and player_id:
+                                render_jump_buttons(player_id, [moment.get('timestamp', '00:00') for moment in probing_misses])
+                            
+                            for probe_idx, miss in enumerate(probing_misses):
+                                st.markdown(render_probing_moment_html(miss, probe_idx + 1), unsafe_allow_html=True)
+                
+                # === EMOTIONAL CUES ===
+                emotional_misses = row.emotional_cues_missed
+                if emotional_misses:
+                    section = st.expander(f"💭 Emotional Cues Missed ({len(emotional_misses)})", key=f"rep_call_{idx}_emotional", on_change="rerun")
+                    with section:
+                        if section.open:
+                            if audio_available and player_id:
+                                render_jump_buttons(player_id, [moment.get('timestamp', '00:00') for moment in emotional_misses])
+                            
+                            for miss in emotional_misses:
+                                st.markdown(render_emotion_moment_html(miss), unsafe_allow_html=True)
+                
+                # === OBJECTION HANDLING ===
+                objections = row.objection_handling_analysis
+                if objections:
+                    section = st.expander(f"🛡️ Objection Handling Analysis ({len(objections)})", key=f"rep_call_{idx}_objections", on_change="rerun")
+                    with section:
+                        if section.open:
+                            if audio_available and player_id:
+                                render_jump_buttons(player_id, [moment.get('timestamp', '00:00') for moment in objections])
+                            
+                            for obj_idx, obj in enumerate(objections):
+                                st.markdown(render_objection_moment_html(obj, obj_idx + 1), unsafe_allow_html=True)
+                
+                # What Went Well / Opportunities
+                st.markdown(render_went_well_html(row.what_went_well, row.opportunities_to_improve),
+                            unsafe_allow_html=True)
+                
+                # Sample Phrases
+                if any(getattr(row, column) for column in PHRASE_COLUMNS):
+                    st.markdown("### 💬 Sample Phrases to Practice")
+                    
+                    phrase_col1, phrase_col2 = st.columns(2)
+                    
+                    with phrase_col1:
+                        if row.sample_phrases_active_listening:
+                            with st.expander("🎧 Active Listening"):
+                                st.markdown("\n".join(f"- _{phrase}_" for phrase in row.sample_phrases_active_listening))
+                        
+                        if row.sample_phrases_probing_deeper:
+                            with st.expander("🔍 Probing Deeper"):
+                                st.markdown("\n".join(f"- _{phrase}_" for phrase in row.sample_phrases_probing_deeper))
+                        
+                        if row.sample_phrases_emotional_acknowledgment:
+                            with st.expander("💭 Emotional Acknowledgment"):
+                                st.markdown("\n".join(f"- _{phrase}_" for phrase in row.sample_phrases_emotional_acknowledgment))
+                    
+                    with phrase_col2:
+                        if row.sample_phrases_spin_implication:
+                            with st.expander("🎯 SPIN Implication (Build Value!)"):
+                                st.markdown("\n".join(f"- _{phrase}_" for phrase in row.sample_phrases_spin_implication))
+                        
+                        if row.sample_phrases_sandler_pain:
+                            with st.expander("💼 Sandler Pain Questions"):
+                                st.markdown("\n".join(f"- _{phrase}_" for phrase in row.sample_phrases_sandler_pain))
+                
+                # Show full transcript, previewing long ones until asked for the rest
+                transcript_section = st.expander("📄 Full Transcript", key=f"rep_call_{idx}_transcript", on_change="rerun")
+                with transcript_section:
+                    if transcript_section.open:
+                        transcript = row.transcript
+                        full_key = f"full_transcript_{idx}"
+                        if len(transcript) > TRANSCRIPT_PREVIEW_CHARS and not st.session_state.get(full_key):
+                            st.text(transcript[:TRANSCRIPT_PREVIEW_CHARS] + "…")
+                            if st.button("Show full transcript", key=f"show_{full_key}"):
+                                st.session_state[full_key] = True
+                                st.rerun(scope="fragment")
+                        else:
+                            st.text(transcript)
 
 # ---------- PAGE ----------
 st.title("🧙‍♂️ CoachGnome – AI Call Coach Dashboard")
@@ -250,6 +1051,7 @@ with st.sidebar:
     st.header("📊 Dashboard Controls")
     if st.button("🔄 Refresh Data"):
         st.cache_data.clear()
+        get_feedback_memo().clear()
         # Clear session state to force reload
         if 'filtered_df' in st.session_state:
             del st.session_state['filtered_df']
@@ -274,6 +1076,8 @@ if raw_df.empty:
 
 # Apply time filter - this runs on filter change
 df = filter_by_time_period(raw_df, date_filter)
+# The period's own agents and outcomes, in the order they first appear in it
+df = with_first_seen_categories(df)
 
 # Show count in sidebar
 with st.sidebar:
@@ -285,1066 +1089,443 @@ if df.empty and date_filter != "All Time":
     st.stop()
 
 # ---------- TABS ----------
+# Stateful tabs rerun on switch, so only the open tab's content is computed and sent
 tab0, tab1, tab2, tab3, tab4 = st.tabs([
     "📋 Executive Summary",
     "🏆 Rep Deep Dive", 
     "🌟 Exceptional Moments",
     "📊 Team Analytics",
     "🔍 Call Search"
-])
+], key="active_tab", on_change="rerun")
+
+# Widgets inside a closed tab aren't rendered, so re-assign their values to keep them across tab switches
+for widget_key in ('selected_agent', 'search_type', 'search_query'):
+    if widget_key in st.session_state:
+        st.session_state[widget_key] = st.session_state[widget_key]
 
 # ===== TAB 0: EXECUTIVE SUMMARY =====
 with tab0:
-    st.header("📋 Executive Summary - Quick Coaching Priorities")
-    st.caption("What needs immediate attention across the team")
-    
-    # [EXECUTIVE SUMMARY CODE - keeping as is from your original]
-    all_agents = df['agent_name'].dropna().unique()
-    
-    team_issues = {
-        'active_listening': [],
-        'probing': [],
-        'emotional_cues': [],
-        'objections': [],
-        'went_to_discount': []
-    }
-    
-    agent_performance = {}
-    
-    for agent in all_agents:
-        agent_calls = df[df['agent_name'] == agent]
+    if tab0.open:
+        # Team-wide aggregates are cached per filtered dataset, not recomputed per rerun
+        agent_performance, team_issues, exceptional_by_category = compute_team_stats(df)
         
-        agent_performance[agent] = {
-            'total_calls': len(agent_calls),
-            'listening_fails': 0,
-            'probing_fails': 0,
-            'emotional_fails': 0,
-            'objection_fails': 0,
-            'discount_count': 0,
-            'exceptional_count': 0,
-            'avg_score': 0,
-            'scores': []
-        }
+        st.header("📋 Executive Summary - Quick Coaching Priorities")
+        st.caption("What needs immediate attention across the team")
         
-        for _, row in agent_calls.iterrows():
-            feedback = row['feedback_parsed']
-            if not feedback:
-                continue
-            
-            listening = len(feedback.get('active_listening_failures', []))
-            probing = len(feedback.get('missed_probing_opportunities', []))
-            emotional = len(feedback.get('emotional_cues_missed', []))
-            objections = feedback.get('objection_handling_analysis', [])
-            
-            agent_performance[agent]['listening_fails'] += listening
-            agent_performance[agent]['probing_fails'] += probing
-            agent_performance[agent]['emotional_fails'] += emotional
-            agent_performance[agent]['objection_fails'] += len(objections)
-            
-            for obj in objections:
-                if obj.get('went_straight_to_discount'):
-                    agent_performance[agent]['discount_count'] += 1
-                    team_issues['went_to_discount'].append(agent)
-            
-            exceptional = feedback.get('exceptional_moments', [])
-            shareworthy = [m for m in exceptional if m.get('shareworthy')]
-            agent_performance[agent]['exceptional_count'] += len(shareworthy)
-            
-            scores = feedback.get('call_score', {})
-            if scores and isinstance(scores, dict):
-                overall = scores.get('overall_score', 0)
-                if overall > 0:
-                    agent_performance[agent]['scores'].append(overall)
+        st.subheader("🚨 Top Priority Issues")
         
-        if agent_performance[agent]['scores']:
-            agent_performance[agent]['avg_score'] = sum(agent_performance[agent]['scores']) / len(agent_performance[agent]['scores'])
-    
-    st.subheader("🚨 Top Priority Issues")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    struggling_listening = sorted([(a, p['listening_fails']) for a, p in agent_performance.items()], key=lambda x: x[1], reverse=True)[:3]
-    struggling_probing = sorted([(a, p['probing_fails']) for a, p in agent_performance.items()], key=lambda x: x[1], reverse=True)[:3]
-    struggling_discount = sorted([(a, p['discount_count']) for a, p in agent_performance.items()], key=lambda x: x[1], reverse=True)[:3]
-    
-    with col1:
-        st.markdown("### 🎧 Active Listening")
-        if struggling_listening and struggling_listening[0][1] > 0:
-            st.error("**Needs Immediate Attention:**")
-            for agent, count in struggling_listening:
-                if count > 0:
-                    st.write(f"- **{agent}**: {count} failures")
-            
-            st.info("**Quick Training Tip:** Practice the 'Mirror & Build' technique - repeat back what the customer said, then ask a follow-up question.")
-        else:
-            st.success("✓ Team performing well!")
-    
-    with col2:
-        st.markdown("### 🔍 Probing Depth")
-        if struggling_probing and struggling_probing[0][1] > 0:
-            st.warning("**Needs Focus:**")
-            for agent, count in struggling_probing:
-                if count > 0:
-                    st.write(f"- **{agent}**: {count} missed opportunities")
-            
-            st.info("**Quick Training Tip:** Use the 'Why → What → How' ladder. Never accept the first answer - dig at least 2 levels deeper.")
-        else:
-            st.success("✓ Team digging deep!")
-    
-    with col3:
-        st.markdown("### 💰 Discount Jumping")
-        if struggling_discount and struggling_discount[0][1] > 0:
-            st.error("**Critical Issue:**")
-            for agent, count in struggling_discount:
-                if count > 0:
-                    st.write(f"- **{agent}**: {count} times")
-            
-            st.info("**Quick Training Tip:** Before ANY discount, ask: 'What happens if you don't solve this problem?' Establish the cost of inaction first.")
-        else:
-            st.success("✓ Value-selling strong!")
-    
-    st.markdown("---")
-    
-    st.subheader("🏆 Performance Tiers")
-    
-    top_performers = []
-    developing = []
-    needs_support = []
-    
-    for agent, perf in agent_performance.items():
-        if perf['avg_score'] >= 7:
-            top_performers.append((agent, perf))
-        elif perf['avg_score'] >= 5:
-            developing.append((agent, perf))
-        else:
-            needs_support.append((agent, perf))
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("### 🥇 Top Performers (7+)")
-        if top_performers:
-            for agent, perf in sorted(top_performers, key=lambda x: x[1]['avg_score'], reverse=True):
-                st.success(f"**{agent}**: {perf['avg_score']:.1f}/10")
-                if perf['exceptional_count'] > 0:
-                    st.caption(f"✨ {perf['exceptional_count']} exceptional moments")
-        else:
-            st.info("No agents in this tier yet")
-    
-    with col2:
-        st.markdown("### 📈 Developing (5-6.9)")
-        if developing:
-            for agent, perf in sorted(developing, key=lambda x: x[1]['avg_score'], reverse=True):
-                st.warning(f"**{agent}**: {perf['avg_score']:.1f}/10")
-        else:
-            st.info("No agents in this tier")
-    
-    with col3:
-        st.markdown("### 🆘 Needs Support (<5)")
-        if needs_support:
-            for agent, perf in sorted(needs_support, key=lambda x: x[1]['avg_score'], reverse=True):
-                st.error(f"**{agent}**: {perf['avg_score']:.1f}/10")
-                issues = []
-                if perf['listening_fails'] > 3:
-                    issues.append("Active Listening")
-                if perf['probing_fails'] > 3:
-                    issues.append("Probing")
-                if perf['discount_count'] > 2:
-                    issues.append("Discounting")
-                if issues:
-                    st.caption(f"⚠️ Focus: {', '.join(issues)}")
-        else:
-            st.success("No agents need urgent support")
-    
-    st.markdown("---")
-    
-    st.subheader("✨ Skill Spotlight - Learn from the Best")
-    
-    exceptional_by_category = {
-        'objection_handling': {},
-        'empathy': {},
-        'active_listening': {},
-        'probing': {}
-    }
-    
-    for _, row in df.iterrows():
-        feedback = row['feedback_parsed']
-        if not feedback:
-            continue
+        col1, col2, col3 = st.columns(3)
         
-        agent = row['agent_name']
-        exceptional = feedback.get('exceptional_moments', [])
+        struggling_listening = nlargest(3, [(a, p['listening_fails']) for a, p in agent_performance.items()], key=lambda x: x[1])
+        struggling_probing = nlargest(3, [(a, p['probing_fails']) for a, p in agent_performance.items()], key=lambda x: x[1])
+        struggling_discount = nlargest(3, [(a, p['discount_count']) for a, p in agent_performance.items()], key=lambda x: x[1])
         
-        for moment in exceptional:
-            if moment.get('shareworthy'):
-                category = moment.get('category', 'general')
-                if category in exceptional_by_category:
-                    if agent not in exceptional_by_category[category]:
-                        exceptional_by_category[category][agent] = 0
-                    exceptional_by_category[category][agent] += 1
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### 🛡️ Objection Handling Champions")
-        if exceptional_by_category['objection_handling']:
-            top_objection = sorted(exceptional_by_category['objection_handling'].items(), key=lambda x: x[1], reverse=True)[:3]
-            for agent, count in top_objection:
-                st.success(f"🏆 **{agent}**: {count} exceptional moments")
-        else:
-            st.info("Building data...")
+        with col1:
+            st.markdown("### 🎧 Active Listening")
+            if struggling_listening and struggling_listening[0][1] > 0:
+                st.error("**Needs Immediate Attention:**")
+                show_table([(agent, count) for agent, count in struggling_listening if count > 0], ["Agent", "Failures"])
+                
+                st.info("**Quick Training Tip:** Practice the 'Mirror & Build' technique - repeat back what the customer said, then ask a follow-up question.")
+            else:
+                st.success("✓ Team performing well!")
         
-        st.markdown("### 🔍 Probing Masters")
-        if exceptional_by_category['probing']:
-            top_probing = sorted(exceptional_by_category['probing'].items(), key=lambda x: x[1], reverse=True)[:3]
-            for agent, count in top_probing:
-                st.success(f"🏆 **{agent}**: {count} exceptional moments")
-        else:
-            st.info("Building data...")
-    
-    with col2:
-        st.markdown("### ❤️ Empathy Experts")
-        if exceptional_by_category['empathy']:
-            top_empathy = sorted(exceptional_by_category['empathy'].items(), key=lambda x: x[1], reverse=True)[:3]
-            for agent, count in top_empathy:
-                st.success(f"🏆 **{agent}**: {count} exceptional moments")
-        else:
-            st.info("Building data...")
+        with col2:
+            st.markdown("### 🔍 Probing Depth")
+            if struggling_probing and struggling_probing[0][1] > 0:
+                st.warning("**Needs Focus:**")
+                show_table([(agent, count) for agent, count in struggling_probing if count > 0], ["Agent", "Missed opportunities"])
+                
+                st.info("**Quick Training Tip:** Use the 'Why → What → How' ladder. Never accept the first answer - dig at least 2 levels deeper.")
+            else:
+                st.success("✓ Team digging deep!")
         
-        st.markdown("### 🎧 Active Listening Leaders")
-        if exceptional_by_category['active_listening']:
-            top_listening = sorted(exceptional_by_category['active_listening'].items(), key=lambda x: x[1], reverse=True)[:3]
-            for agent, count in top_listening:
-                st.success(f"🏆 **{agent}**: {count} exceptional moments")
-        else:
-            st.info("Building data...")
-    
-    st.markdown("---")
-    
-    st.subheader("⚡ Recommended Actions")
-    
-    actions = []
-    
-    total_listening_fails = sum(p['listening_fails'] for p in agent_performance.values())
-    total_probing_fails = sum(p['probing_fails'] for p in agent_performance.values())
-    total_discount_jumps = sum(p['discount_count'] for p in agent_performance.values())
-    
-    if total_listening_fails > len(df) * 0.3:
-        actions.append("🚨 **Team Training Needed:** Active Listening workshop - over 30% of calls show listening failures")
-    
-    if total_probing_fails > len(df) * 0.4:
-        actions.append("⚠️ **Team Training Needed:** SPIN Selling refresher - agents stopping at surface answers")
-    
-    if total_discount_jumps > len(df) * 0.2:
-        actions.append("🔴 **Urgent:** Value-based selling training - too many reps jumping to discounts")
-    
-    if needs_support:
-        for agent, perf in needs_support:
-            actions.append(f"👤 **1-on-1 Coaching:** {agent} needs immediate support (score: {perf['avg_score']:.1f})")
-    
-    if actions:
-        for action in actions:
-            st.warning(action)
-    else:
-        st.success("✅ Team is performing well! Continue monitoring and celebrating wins.")
-
-# ===== TAB 1: REP DEEP DIVE =====
-with tab1:
-    st.header("🏆 Rep Performance Deep Dive")
-    
-    agents = df['agent_name'].dropna().unique()
-    
-    if len(agents) == 0:
-        st.info("No agent data available yet")
-    else:
-        selected_agent = st.selectbox("Select Agent:", sorted(agents))
+        with col3:
+            st.markdown("### 💰 Discount Jumping")
+            if struggling_discount and struggling_discount[0][1] > 0:
+                st.error("**Critical Issue:**")
+                show_table([(agent, count) for agent, count in struggling_discount if count > 0], ["Agent", "Times"])
+                
+                st.info("**Quick Training Tip:** Before ANY discount, ask: 'What happens if you don't solve this problem?' Establish the cost of inaction first.")
+            else:
+                st.success("✓ Value-selling strong!")
         
-        agg_data = aggregate_rep_performance(df, selected_agent)
+        st.markdown("---")
         
-        st.subheader(f"📈 {selected_agent} - Overall Performance")
+        st.subheader("🏆 Performance Tiers")
         
-        col1, col2, col3, col4 = st.columns(4)
+        top_performers = []
+        developing = []
+        needs_support = []
+        
+        for agent, perf in agent_performance.items():
+            if perf['avg_score'] >= 7:
+                top_performers.append((agent, perf))
+            elif perf['avg_score'] >= 5:
+                developing.append((agent, perf))
+            else:
+                needs_support.append((agent, perf))
+        
+        col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Calls", agg_data['total_calls'])
+            st.markdown("### 🥇 Top Performers (7+)")
+            if top_performers:
+                show_table(
+                    [(agent, perf['avg_score'], perf['exceptional_count'])
+                     for agent, perf in sorted(top_performers, key=lambda x: x[1]['avg_score'], reverse=True)],
+                    ["Agent", "Score", "✨ Exceptional"],
+                    Score=SCORE_COLUMN
+                )
+            else:
+                st.info("No agents in this tier yet")
         
         with col2:
-            total_outcomes = agg_data['outcomes']['closed'] + agg_data['outcomes']['lost']
-            close_rate = (agg_data['outcomes']['closed'] / total_outcomes * 100) if total_outcomes > 0 else 0
-            st.metric("Close Rate", f"{close_rate:.1f}%")
+            st.markdown("### 📈 Developing (5-6.9)")
+            if developing:
+                show_table(
+                    [(agent, perf['avg_score'])
+                     for agent, perf in sorted(developing, key=lambda x: x[1]['avg_score'], reverse=True)],
+                    ["Agent", "Score"],
+                    Score=SCORE_COLUMN
+                )
+            else:
+                st.info("No agents in this tier")
         
         with col3:
-            avg_overall = sum(agg_data['scores']['overall']) / len(agg_data['scores']['overall']) if agg_data['scores']['overall'] else 0
-            st.metric("Avg Score", f"{avg_overall:.1f}/10")
-        
-        with col4:
-            st.metric("W/L Record", f"{agg_data['outcomes']['closed']}/{agg_data['outcomes']['lost']}")
+            st.markdown("### 🆘 Needs Support (<5)")
+            if needs_support:
+                support_rows = []
+                for agent, perf in sorted(needs_support, key=lambda x: x[1]['avg_score'], reverse=True):
+                    issues = []
+                    if perf['listening_fails'] > 3:
+                        issues.append("Active Listening")
+                    if perf['probing_fails'] > 3:
+                        issues.append("Probing")
+                    if perf['discount_count'] > 2:
+                        issues.append("Discounting")
+                    support_rows.append((agent, perf['avg_score'], ', '.join(issues)))
+                show_table(support_rows, ["Agent", "Score", "⚠️ Focus"], Score=SCORE_COLUMN)
+            else:
+                st.success("No agents need urgent support")
         
         st.markdown("---")
         
-        st.subheader("🎯 Skill Scores Breakdown")
-        
-        score_cols = st.columns(4)
-        skill_names = [
-            ('active_listening', '🎧 Active Listening'),
-            ('probing_depth', '🔍 Probing Depth'),
-            ('emotional_intelligence', '💭 Emotional IQ'),
-            ('value_based_selling', '💰 Value Selling'),
-            ('spin_effectiveness', '🎯 SPIN'),
-            ('sandler_effectiveness', '💼 Sandler'),
-            ('objection_handling', '🛡️ Objections')
-        ]
-        
-        for idx, (key, label) in enumerate(skill_names):
-            with score_cols[idx % 4]:
-                scores = agg_data['scores'][key]
-                avg = sum(scores) / len(scores) if scores else 0
-                st.metric(label, f"{avg:.1f}/10")
-        
-        st.markdown("---")
+        st.subheader("✨ Skill Spotlight - Learn from the Best")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            st.subheader("🚨 Critical Patterns to Address")
-            
-            if agg_data['active_listening_patterns']:
-                with st.expander(f"🎧 Active Listening Issues ({len(agg_data['active_listening_patterns'])} instances)", expanded=True):
-                    patterns = {}
-                    for pattern in agg_data['active_listening_patterns']:
-                        issue = pattern['what_was_missed']
-                        if issue not in patterns:
-                            patterns[issue] = 0
-                        patterns[issue] += 1
-                    
-                    sorted_patterns = sorted(patterns.items(), key=lambda x: x[1], reverse=True)[:3]
-                    for issue, count in sorted_patterns:
-                        st.error(f"**{count}x**: {issue}")
-            
-            if agg_data['probing_patterns']:
-                with st.expander(f"🔍 Probing Issues ({len(agg_data['probing_patterns'])} instances)"):
-                    st.warning(f"Stopped at surface level **{len(agg_data['probing_patterns'])} times** across calls")
-                    st.write("**Pattern:** Not digging deeper after initial answers")
+            st.markdown("### 🛡️ Objection Handling Champions")
+            if exceptional_by_category['objection_handling']:
+                top_objection = nlargest(3, exceptional_by_category['objection_handling'].items(), key=lambda x: x[1])
+                for agent, count in top_objection:
+                    st.success(f"🏆 **{agent}**: {count} exceptional moments")
+            else:
+                st.info("Building data...")
             
-            if agg_data['emotional_cue_patterns']:
-                with st.expander(f"💭 Emotional Cues Missed ({len(agg_data['emotional_cue_patterns'])} instances)"):
-                    emotions = {}
-                    for pattern in agg_data['emotional_cue_patterns']:
-                        emotion = pattern['emotion']
-                        if emotion not in emotions:
-                            emotions[emotion] = 0
-                        emotions[emotion] += 1
-                    
-                    for emotion, count in sorted(emotions.items(), key=lambda x: x[1], reverse=True):
-                        st.warning(f"**{emotion.title()}**: {count}x")
+            st.markdown("### 🔍 Probing Masters")
+            if exceptional_by_category['probing']:
+                top_probing = nlargest(3, exceptional_by_category['probing'].items(), key=lambda x: x[1])
+                for agent, count in top_probing:
+                    st.success(f"🏆 **{agent}**: {count} exceptional moments")
+            else:
+                st.info("Building data...")
         
         with col2:
-            st.subheader("🎓 Framework Gaps")
-            
-            with st.expander("🎯 SPIN Selling Gaps", expanded=True):
-                spin_total = agg_data['total_calls']
-                
-                st.write(f"**Situation Questions**: Missing in {agg_data['spin_gaps']['situation']}/{spin_total} calls")
-                st.write(f"**Problem Questions**: Missing in {agg_data['spin_gaps']['problem']}/{spin_total} calls")
-                st.write(f"**⚠️ Implication Questions**: Missing in {agg_data['spin_gaps']['implication']}/{spin_total} calls")
-                st.write(f"**Need-Payoff Questions**: Missing in {agg_data['spin_gaps']['need_payoff']}/{spin_total} calls")
-                
-                if agg_data['spin_gaps']['implication'] > spin_total * 0.5:
-                    st.error("🚨 **CRITICAL**: Not building value with Implication questions!")
-            
-            with st.expander("💼 Sandler Methodology Gaps"):
-                st.write(f"**Up-Front Contract**: Missing in {agg_data['sandler_gaps']['upfront_contract']}/{spin_total} calls")
-                st.write(f"**Surface Pain Only**: {agg_data['sandler_gaps']['pain_depth_surface']}/{spin_total} calls")
-                st.write(f"**Budget Not Qualified**: {agg_data['sandler_gaps']['budget_qualified']}/{spin_total} calls")
-                st.write(f"**Decision Process Unknown**: {agg_data['sandler_gaps']['decision_process']}/{spin_total} calls")
+            st.markdown("### ❤️ Empathy Experts")
+            if exceptional_by_category['empathy']:
+                top_empathy = nlargest(3, exceptional_by_category['empathy'].items(), key=lambda x: x[1])
+                for agent, count in top_empathy:
+                    st.success(f"🏆 **{agent}**: {count} exceptional moments")
+            else:
+                st.info("Building data...")
             
-            if agg_data['objection_patterns']:
-                with st.expander(f"🛡️ Objection Handling ({len(agg_data['objection_patterns'])} objections)"):
-                    went_to_discount = sum(1 for o in agg_data['objection_patterns'] if o['went_to_discount'])
-                    avg_effectiveness = sum(o['effectiveness'] for o in agg_data['objection_patterns']) / len(agg_data['objection_patterns'])
-                    
-                    if went_to_discount > 0:
-                        st.error(f"⚠️ Went straight to discount **{went_to_discount} times**")
-                    
-                    st.write(f"**Avg Effectiveness**: {avg_effectiveness:.1f}/10")
+            st.markdown("### 🎧 Active Listening Leaders")
+            if exceptional_by_category['active_listening']:
+                top_listening = nlargest(3, exceptional_by_category['active_listening'].items(), key=lambda x: x[1])
+                for agent, count in top_listening:
+                    st.success(f"🏆 **{agent}**: {count} exceptional moments")
+            else:
+                st.info("Building data...")
         
         st.markdown("---")
         
-        col1, col2 = st.columns(2)
+        st.subheader("⚡ Recommended Actions")
         
-        with col1:
-            st.subheader("💪 Common Strengths")
-            if agg_data['common_strengths']:
-                strength_counts = {}
-                for strength in agg_data['common_strengths']:
-                    # Convert to string if it's a dict or other type
-                    if isinstance(strength, dict):
-                        strength_text = strength.get('text', str(strength))
-                    else:
-                        strength_text = str(strength)
-                    
-                    if strength_text not in strength_counts:
-                        strength_counts[strength_text] = 0
-                    strength_counts[strength_text] += 1
-                
-                top_strengths = sorted(strength_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-                for strength, count in top_strengths:
-                    st.success(f"✓ {strength} ({count} calls)")
-            else:
-                st.info("Building performance history...")
+        actions = []
         
-        with col2:
-            st.subheader("📈 Top Growth Areas")
-            if agg_data['common_weaknesses']:
-                weakness_counts = {}
-                for weakness in agg_data['common_weaknesses']:
-                    # Convert to string if it's a dict or other type
-                    if isinstance(weakness, dict):
-                        weakness_text = weakness.get('text', str(weakness))
-                    else:
-                        weakness_text = str(weakness)
-                    
-                    if weakness_text not in weakness_counts:
-                        weakness_counts[weakness_text] = 0
-                    weakness_counts[weakness_text] += 1
-                
-                top_weaknesses = sorted(weakness_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-                for weakness, count in top_weaknesses:
-                    st.warning(f"⚠️ {weakness} ({count} calls)")
-            else:
-                st.info("Building performance history...")
+        total_listening_fails = sum(p['listening_fails'] for p in agent_performance.values())
+        total_probing_fails = sum(p['probing_fails'] for p in agent_performance.values())
+        total_discount_jumps = sum(p['discount_count'] for p in agent_performance.values())
         
-        st.markdown("---")
+        if total_listening_fails > len(df) * 0.3:
+            actions.append("🚨 **Team Training Needed:** Active Listening workshop - over 30% of calls show listening failures")
         
-        st.subheader(f"📞 All Calls with Enhanced Coaching ({agg_data['total_calls']})")
+        if total_probing_fails > len(df) * 0.4:
+            actions.append("⚠️ **Team Training Needed:** SPIN Selling refresher - agents stopping at surface answers")
         
-        agent_calls = df[df['agent_name'] == selected_agent]
+        if total_discount_jumps > len(df) * 0.2:
+            actions.append("🔴 **Urgent:** Value-based selling training - too many reps jumping to discounts")
         
-        for idx, row in agent_calls.iterrows():
-            feedback = row['feedback_parsed']
-            outcome = feedback.get('call_outcome', 'unknown') if feedback else 'unknown'
+        if needs_support:
+            for agent, perf in needs_support:
+                actions.append(f"👤 **1-on-1 Coaching:** {agent} needs immediate support (score: {perf['avg_score']:.1f})")
+        
+        if actions:
+            for action in actions:
+                st.warning(action)
+        else:
+            st.success("✅ Team is performing well! Continue monitoring and celebrating wins.")
+
+# ===== TAB 1: REP DEEP DIVE =====
+with tab1:
+    if tab1.open:
+        st.header("🏆 Rep Performance Deep Dive")
+        
+        agents = df['agent_name'].dropna().unique()
+        
+        if len(agents) == 0:
+            st.info("No agent data available yet")
+        else:
+            selected_agent = st.selectbox("Select Agent:", sorted(agents), key="selected_agent")
             
-            outcome_icons = {
-                "closed": "🟢",
-                "lost": "🔴",
-                "follow-up-scheduled": "🟡",
-                "needs-callback": "🟠"
-            }
-            icon = outcome_icons.get(outcome, "⚪")
+            agg_data = aggregate_rep_performance(df, selected_agent)
             
-            with st.expander(f"{icon} {row['filename']} - {outcome.upper()} ({row['date']})"):
-                if feedback:
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**Summary:** {feedback.get('summary', '')}")
-                        st.write(f"**Customer Intent:** {feedback.get('customer_intent', '')}")
-                    with col2:
-                        scores = feedback.get('call_score', {})
-                        if scores:
-                            st.write(f"**Overall Score:** {scores.get('overall_score', 0)}/10")
-                        st.write(f"**Close Reason:** {feedback.get('close_reason', '')}")
-                    with col3:
-                        disposition = row.get('disposition', 'Unknown')
-                        if pd.notna(disposition):
-                            st.write(f"**Five9 Disposition:** {disposition}")
-                            if 'credit card' in str(disposition).lower():
-                                st.success("💳 Reached Credit Card Stage!")
-                        st.write(f"**Call Duration:** {row.get('call_duration', 'N/A')}s")
-                    
-                    st.markdown("---")
+            st.subheader(f"📈 {selected_agent} - Overall Performance")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Total Calls", agg_data['total_calls'])
+            
+            with col2:
+                total_outcomes = agg_data['outcomes']['closed'] + agg_data['outcomes']['lost']
+                close_rate = (agg_data['outcomes']['closed'] / total_outcomes * 100) if total_outcomes > 0 else 0
+                st.metric("Close Rate", f"{close_rate:.1f}%")
+            
+            with col3:
+                avg_overall = agg_data['scores']['overall']
+                st.metric("Avg Score", f"{avg_overall:.1f}/10")
+            
+            with col4:
+                st.metric("W/L Record", f"{agg_data['outcomes']['closed']}/{agg_data['outcomes']['lost']}")
+            
+            st.markdown("---")
+            
+            st.subheader("🎯 Skill Scores Breakdown")
+            
+            score_cols = st.columns(4)
+            skill_names = [
+                ('active_listening', '🎧 Active Listening'),
+                ('probing_depth', '🔍 Probing Depth'),
+                ('emotional_intelligence', '💭 Emotional IQ'),
+                ('value_based_selling', '💰 Value Selling'),
+                ('spin_effectiveness', '🎯 SPIN'),
+                ('sandler_effectiveness', '💼 Sandler'),
+                ('objection_handling', '🛡️ Objections')
+            ]
+            
+            for idx, (key, label) in enumerate(skill_names):
+                with score_cols[idx % 4]:
+                    st.metric(label, f"{agg_data['scores'][key]:.1f}/10")
+            
+            st.markdown("---")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("🚨 Critical Patterns to Address")
+                
+                if not agg_data['active_listening_patterns'].empty:
+                    with st.expander(f"🎧 Active Listening Issues ({len(agg_data['active_listening_patterns'])} instances)", expanded=True):
+                        issue_counts = agg_data['active_listening_patterns']['what_was_missed'].value_counts()
+                        show_table(issue_counts.head(3).items(), ["What was missed", "Count"])
+                
+                if not agg_data['probing_patterns'].empty:
+                    with st.expander(f"🔍 Probing Issues ({len(agg_data['probing_patterns'])} instances)"):
+                        st.warning(f"Stopped at surface level **{len(agg_data['probing_patterns'])} times** across calls")
+                        st.write("**Pattern:** Not digging deeper after initial answers")
+                
+                if not agg_data['emotional_cue_patterns'].empty:
+                    with st.expander(f"💭 Emotional Cues Missed ({len(agg_data['emotional_cue_patterns'])} instances)"):
+                        emotion_counts = agg_data['emotional_cue_patterns']['customer_emotion'].value_counts()
+                        show_table([(emotion.title(), count) for emotion, count in emotion_counts.items()], ["Emotion", "Count"])
+            
+            with col2:
+                st.subheader("🎓 Framework Gaps")
+                
+                with st.expander("🎯 SPIN Selling Gaps", expanded=True):
+                    spin_total = agg_data['total_calls']
                     
-                    # ==== LOAD AUDIO PLAYER FIRST ====
-                    audio_available = False
-                    player_id = None
+                    st.write(f"**Situation Questions**: Missing in {agg_data['spin_gaps']['situation']}/{spin_total} calls")
+                    st.write(f"**Problem Questions**: Missing in {agg_data['spin_gaps']['problem']}/{spin_total} calls")
+                    st.write(f"**⚠️ Implication Questions**: Missing in {agg_data['spin_gaps']['implication']}/{spin_total} calls")
+                    st.write(f"**Need-Payoff Questions**: Missing in {agg_data['spin_gaps']['need_payoff']}/{spin_total} calls")
                     
-                    if pd.notna(row.get('audio_url')) and row.get('audio_url'):
-                        audio_available = True
-                        google_drive_url = row['audio_url']
+                    if agg_data['spin_gaps']['implication'] > spin_total * 0.5:
+                        st.error("🚨 **CRITICAL**: Not building value with Implication questions!")
+                
+                with st.expander("💼 Sandler Methodology Gaps"):
+                    st.write(f"**Up-Front Contract**: Missing in {agg_data['sandler_gaps']['upfront_contract']}/{spin_total} calls")
+                    st.write(f"**Surface Pain Only**: {agg_data['sandler_gaps']['pain_depth_surface']}/{spin_total} calls")
+                    st.write(f"**Budget Not Qualified**: {agg_data['sandler_gaps']['budget_qualified']}/{spin_total} calls")
+                    st.write(f"**Decision Process Unknown**: {agg_data['sandler_gaps']['decision_process']}/{spin_total} calls")
+                
+                if not agg_data['objection_patterns'].empty:
+                    with st.expander(f"🛡️ Objection Handling ({len(agg_data['objection_patterns'])} objections)"):
+                        objection_patterns = agg_data['objection_patterns']
+                        went_to_discount = int(objection_patterns['went_straight_to_discount'].astype(bool).sum())
+                        avg_effectiveness = objection_patterns['effectiveness_rating'].mean()
                         
-                        if 'drive.google.com' in google_drive_url:
-                            with st.spinner("🎧 Loading audio player..."):
-                                audio_base64 = download_audio_from_gdrive(google_drive_url, row['filename'])
-                            
-                            if audio_base64:
-                                player_id = f"main_audio_{row['filename'].replace(' ', '_').replace('.', '_')}"
-                                
-                                audio_html = f"""
-                                <div style="position: sticky; top: 0; z-index: 1000; background: white; padding: 15px; border: 2px solid #4CAF50; border-radius: 8px; margin-bottom: 20px;">
-                                    <p style="margin: 0 0 10px 0; font-weight: bold; color: #333;">
-                                        🎧 Master Audio Player - Use timestamp buttons below to jump to specific moments
-                                    </p>
-                                    <audio id="{player_id}" controls style="width: 100%;">
-                                        <source src="data:audio/wav;base64,{audio_base64}" type="audio/wav">
-                                    </audio>
-                                </div>
-                                """
-                                
-                                st.markdown(audio_html, unsafe_allow_html=True)
-                                st.success("✅ Audio loaded! Click '▶ Jump to...' buttons below.")
-                    
-                    st.markdown("---")
-                    
-                    st.subheader("🎯 Coaching Breakdown")
-                    
-                    # === ACTIVE LISTENING ===
-                    listening_fails = feedback.get('active_listening_failures', [])
-                    if listening_fails:
-                        st.markdown("### 🎧 Active Listening - Coaching Moments")
+                        if went_to_discount > 0:
+                            st.error(f"⚠️ Went straight to discount **{went_to_discount} times**")
                         
-                        for fail_idx, fail in enumerate(listening_fails):
-                            st.markdown(f"#### 📍 Moment {fail_idx + 1} - Timestamp: {fail.get('timestamp', 'N/A')}")
-                            
-                            # Audio jump button
-                            if audio_available and player_id:
-                                ts = fail.get('timestamp', '00:00')
-                                start_seconds = 0
-                                try:
-                                    if ':' in ts:
-                                        parts = ts.split(':')
-                                        if len(parts) == 2:
-                                            start_seconds = int(parts[0]) * 60 + int(parts[1])
-                                        elif len(parts) == 3:
-                                            start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                                    else:
-                                        start_seconds = int(float(ts))
-                                except:
-                                    start_seconds = 0
-                                
-                                timestamp_button = f"""
-                                    <div style="margin-bottom:15px; padding:10px; background:#f0f8ff; border-radius:5px;">
-                                        <button onclick="var p = window.parent.document.getElementById('{player_id}'); if (p) {{ p.currentTime = {start_seconds}; p.play(); window.parent.scrollTo({{top: 0, behavior: 'smooth'}}); }}" 
-                                        style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:5px; cursor:pointer; font-weight:bold;">
-                                            ▶ Jump to {ts}
-                                        </button>
-                                    </div>
-                                """
-                                components.html(timestamp_button, height=80)
-                            
-                            # Coaching content
-                            st.markdown("**🗣️ What Was Said:**")
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.info(f"**Customer:** \"{fail.get('customer_said', 'N/A')}\"")
-                            with col2:
-                                st.warning(f"**Rep:** \"{fail.get('rep_response', 'N/A')}\"")
-                            
-                            st.markdown("**📊 Coaching Analysis:**")
-                            
-                            rep_attempted = fail.get('what_rep_attempted', '')
-                            if rep_attempted and rep_attempted.lower() not in ['none', 'nothing', '']:
-                                st.success(f"**✓ Rep Attempted:** {rep_attempted}")
-                            
-                            what_worked = fail.get('what_worked', '')
-                            if what_worked and what_worked.lower() not in ['none', '']:
-                                st.success(f"**✓ What Worked:** {what_worked}")
-                            
-                            st.error(f"**❌ What Was Missed:** {fail.get('what_was_missed', 'N/A')}")
-                            
-                            why_matters = fail.get('why_it_matters', '')
-                            if why_matters:
-                                st.warning(f"**⚠️ Why It Matters:** {why_matters}")
-                            
-                            st.markdown("**💡 Better Response:**")
-                            st.success(f"\"{fail.get('better_response', 'N/A')}\"")
-                            
-                            framework = fail.get('framework_connection', '')
-                            if framework:
-                                st.info(f"**🎓 Framework:** {framework}")
-                            
-                            st.markdown("---")
+                        st.write(f"**Avg Effectiveness**: {avg_effectiveness:.1f}/10")
+            
+            st.markdown("---")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("💪 Common Strengths")
+                if not agg_data['common_strengths'].empty:
+                    show_table(agg_data['common_strengths'].items(), ["Strength", "Calls"])
+                else:
+                    st.info("Building performance history...")
+            
+            with col2:
+                st.subheader("📈 Top Growth Areas")
+                if not agg_data['common_weaknesses'].empty:
+                    show_table(agg_data['common_weaknesses'].items(), ["Growth area", "Calls"])
+                else:
+                    st.info("Building performance history...")
+            
+            st.markdown("---")
+            
+            # Calls without parsed feedback have nothing to coach on, so they get no card
+            agent_calls = df[(df['agent_name'] == selected_agent) & df['has_feedback']]
+            
+            st.subheader(f"📞 All Calls with Enhanced Coaching ({len(agent_calls)})")
+            
+            render_call_cards(agent_calls, (selected_agent, date_filter))
+
+# ===== TAB 2: EXCEPTIONAL MOMENTS =====
+with tab2:
+    if tab2.open:
+        st.header("🌟 Exceptional Moments Feed")
+        st.caption("Share these wins with your team!")
+        
+        exceptional_calls = collect_exceptional_calls(df)
+        
+        if not exceptional_calls:
+            st.info("No exceptional moments found yet. Keep coaching!")
+        else:
+            for call in exceptional_calls:
+                with st.expander(f"⭐ {call['agent_name']} - {call['filename']} ({call['date']})"):
+                    st.write(f"**Agent:** {call['agent_name']}")
+                    st.write(f"**Call Outcome:** {call['call_outcome'].upper()}")
                     
-                    # === PROBING ===
-                    probing_misses = feedback.get('missed_probing_opportunities', [])
-                    if probing_misses:
-                        st.markdown("### 🔍 Missed Probing Opportunities")
-                        
-                        for probe_idx, miss in enumerate(probing_misses):
-                            st.markdown(f"#### 📍 Opportunity {probe_idx + 1} - Timestamp: {miss.get('timestamp', 'N/A')}")
-                            
-                            # Audio jump button
-                            if audio_available and player_id:
-                                ts = miss.get('timestamp', '00:00')
-                                start_seconds = 0
-                                try:
-                                    if ':' in ts:
-                                        parts = ts.split(':')
-                                        if len(parts) == 2:
-                                            start_seconds = int(parts[0]) * 60 + int(parts[1])
-                                        elif len(parts) == 3:
-                                            start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                                    else:
-                                        start_seconds = int(float(ts))
-                                except:
-                                    start_seconds = 0
-                                
-                                timestamp_button = f"""
-                                    <div style="margin-bottom:15px; padding:10px; background:#f0f8ff; border-radius:5px;">
-                                        <button onclick="var p = window.parent.document.getElementById('{player_id}'); if (p) {{ p.currentTime = {start_seconds}; p.play(); window.parent.scrollTo({{top: 0, behavior: 'smooth'}}); }}" 
-                                        style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:5px; cursor:pointer; font-weight:bold;">
-                                            ▶ Jump to {ts}
-                                        </button>
-                                    </div>
-                                """
-                                components.html(timestamp_button, height=80)
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                st.markdown("**What Happened:**")
-                                st.info(f"**Customer's Surface Answer:** \"{miss.get('surface_answer', 'N/A')}\"")
-                                
-                                what_did = miss.get('what_rep_did_instead', '')
-                                if what_did:
-                                    st.warning(f"**Rep Did Instead:** {what_did}")
-                                else:
-                                    st.warning("**Rep moved on without digging deeper**")
-                                
-                                why_hurts = miss.get('why_stopping_hurts', '')
-                                if why_hurts:
-                                    st.error(f"**Cost of Stopping:** {why_hurts}")
-                            
-                            with col2:
-                                st.markdown("**💡 Should Have Asked:**")
-                                st.success(f"\"{miss.get('should_have_asked', 'N/A')}\"")
-                                
-                                why_works = miss.get('why_this_question_works', '')
-                                if why_works:
-                                    st.info(f"**Why This Works:** {why_works}")
-                                
-                                framework = miss.get('framework_connection', '')
-                                if framework:
-                                    st.info(f"**🎓 Framework:** {framework}")
-                            
-                            st.markdown("---")
+                    st.markdown("---")
                     
-                    # === EMOTIONAL CUES ===
-                    emotional_misses = feedback.get('emotional_cues_missed', [])
-                    if emotional_misses:
-                        st.markdown("### 💭 Emotional Cues Missed")
-                        emotion_icons = {
-                            "frustration": "😤", "hesitation": "🤔", "excitement": "😊",
-                            "concern": "😟", "doubt": "🤨", "fear": "😰",
-                            "distrust": "🤐", "pain": "😣", "relief": "😌"
-                        }
+                    for moment in call['moments']:
+                        category = moment.get('category', 'general')
+                        icon = CATEGORY_ICONS.get(category, '⭐')
                         
-                        for emo_idx, miss in enumerate(emotional_misses):
-                            emotion = miss.get('customer_emotion', '')
-                            icon = emotion_icons.get(emotion, "💭")
-                            ack_level = miss.get('rep_acknowledgment_level', 'none')
-                            
-                            st.markdown(f"#### {icon} {emotion.title()} - Timestamp: {miss.get('timestamp', 'N/A')}")
-                            
-                            if ack_level == 'full':
-                                st.success("✅ Rep fully acknowledged this emotion")
-                            elif ack_level == 'partial':
-                                st.warning("⚠️ Rep partially acknowledged this emotion")
-                            else:
-                                st.error("❌ Rep did not acknowledge this emotion")
-                            
-                            # Audio jump button
-                            if audio_available and player_id:
-                                ts = miss.get('timestamp', '00:00')
-                                start_seconds = 0
-                                try:
-                                    if ':' in ts:
-                                        parts = ts.split(':')
-                                        if len(parts) == 2:
-                                            start_seconds = int(parts[0]) * 60 + int(parts[1])
-                                        elif len(parts) == 3:
-                                            start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                                    else:
-                                        start_seconds = int(float(ts))
-                                except:
-                                    start_seconds = 0
-                                
-                                timestamp_button = f"""
-                                    <div style="margin-bottom:15px; padding:10px; background:#f0f8ff; border-radius:5px;">
-                                        <button onclick="var p = window.parent.document.getElementById('{player_id}'); if (p) {{ p.currentTime = {start_seconds}; p.play(); window.parent.scrollTo({{top: 0, behavior: 'smooth'}}); }}" 
-                                        style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:5px; cursor:pointer; font-weight:bold;">
-                                            ▶ Jump to {ts}
-                                        </button>
-                                    </div>
-                                """
-                                components.html(timestamp_button, height=80)
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                st.markdown("**What Happened:**")
-                                st.info(f"**Emotional Signal:** {miss.get('signal', 'N/A')}")
-                                
-                                rep_attempted = miss.get('rep_attempted', '')
-                                if rep_attempted and rep_attempted.lower() not in ['none', '']:
-                                    st.warning(f"**Rep Said:** {rep_attempted}")
-                                    
-                                    what_worked = miss.get('what_worked', '')
-                                    if what_worked and what_worked.lower() not in ['none', '']:
-                                        st.success(f"**✓ What Worked:** {what_worked}")
-                                
-                                rep_missed = miss.get('rep_missed_it', '')
-                                if rep_missed:
-                                    st.error(f"**❌ What Was Missed:** {rep_missed}")
-                                
-                                why_matters = miss.get('why_it_matters', '')
-                                if why_matters:
-                                    st.warning(f"**⚠️ Impact:** {why_matters}")
-                            
-                            with col2:
-                                st.markdown("**💡 Complete Empathy Response:**")
-                                st.success(f"\"{miss.get('empathy_response', 'N/A')}\"")
-                                
-                                framework = miss.get('framework_connection', '')
-                                if framework:
-                                    st.info(f"**🎓 Framework:** {framework}")
-                            
-                            st.markdown("---")
-                    
-                    # === OBJECTION HANDLING ===
-                    objections = feedback.get('objection_handling_analysis', [])
-                    if objections:
-                        st.markdown("### 🛡️ Objection Handling Analysis")
+                        st.markdown(f"### {icon} {category.replace('_', ' ').title()}")
+                        st.markdown(f"**⏱️ Timestamp: {moment.get('timestamp', 'N/A')}**")
                         
-                        for obj_idx, obj in enumerate(objections):
-                            effectiveness = obj.get('effectiveness_rating', 0)
-                            color = "🟢" if effectiveness >= 7 else "🟡" if effectiveness >= 4 else "🔴"
-                            
-                            st.markdown(f"#### {color} Objection {obj_idx + 1}: \"{obj.get('objection', '')}\"")
-                            st.caption(f"Effectiveness: {effectiveness}/10 | Timestamp: {obj.get('timestamp', 'N/A')}")
-                            
-                            # Audio jump button
-                            if audio_available and player_id:
-                                ts = obj.get('timestamp', '00:00')
-                                start_seconds = 0
-                                try:
-                                    if ':' in ts:
-                                        parts = ts.split(':')
-                                        if len(parts) == 2:
-                                            start_seconds = int(parts[0]) * 60 + int(parts[1])
-                                        elif len(parts) == 3:
-                                            start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                                    else:
-                                        start_seconds = int(float(ts))
-                                except:
-                                    start_seconds = 0
-                                
-                                timestamp_button = f"""
-                                    <div style="margin-bottom:15px; padding:10px; background:#f0f8ff; border-radius:5px;">
-                                        <button onclick="var p = window.parent.document.getElementById('{player_id}'); if (p) {{ p.currentTime = {start_seconds}; p.play(); window.parent.scrollTo({{top: 0, behavior: 'smooth'}}); }}" 
-                                        style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:5px; cursor:pointer; font-weight:bold;">
-                                            ▶ Jump to {ts}
-                                        </button>
-                                    </div>
-                                """
-                                components.html(timestamp_button, height=80)
-                            
-                            st.markdown("**🎯 The Real Issue:**")
-                            st.info(f"{obj.get('real_objection', 'Unknown')}")
-                            
-                            st.markdown("---")
-                            
-                            col1, col2 = st.columns([1, 1])
-                            
-                            with col1:
-                                st.markdown("**📋 What Happened:**")
-                                st.warning(f"**Rep's Response:** \"{obj.get('rep_response', 'N/A')}\"")
-                                
-                                rep_attempted = obj.get('rep_attempted', '')
-                                if rep_attempted and rep_attempted.lower() not in ['none', '']:
-                                    st.info(f"**Rep Attempted:** {rep_attempted}")
-                                
-                                what_worked = obj.get('what_worked', '')
-                                if what_worked and what_worked.lower() not in ['none', 'nothing']:
-                                    st.success(f"**✓ What Worked:** {what_worked}")
-                            
-                            with col2:
-                                st.markdown("**❌ Critical Failures:**")
-                                failures = obj.get('critical_failures', [])
-                                if failures:
-                                    for failure in failures:
-                                        st.error(f"• {failure}")
-                                
-                                if obj.get('went_straight_to_discount'):
-                                    st.error("💰 **Jumped straight to discount!**")
-                                
-                                if not obj.get('value_established'):
-                                    st.error("⚠️ **Value was NOT established first**")
-                            
-                            st.markdown("---")
-                            
-                            st.markdown("**💡 Step-by-Step Better Approach:**")
-                            
-                            steps = obj.get('step_by_step_better_approach', [])
-                            if steps:
-                                for step in steps:
-                                    step_num = step.get('step', '')
-                                    action = step.get('action', '')
-                                    example = step.get('example', '')
-                                    why = step.get('why', '')
-                                    
-                                    st.markdown(f"**Step {step_num}: {action}**")
-                                    st.success(f"💬 \"{example}\"")
-                                    if why:
-                                        st.caption(f"📖 {why}")
-                                    st.markdown("")
-                            
-                            st.markdown("**🎓 Framework Recommendation:**")
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                technique = obj.get('sandler_technique_recommended', '')
-                                if technique:
-                                    st.info(f"**Sandler Technique:** {technique}")
-                                
-                                why_tech = obj.get('why_this_technique', '')
-                                if why_tech:
-                                    st.caption(f"💡 {why_tech}")
-                            
-                            with col2:
-                                frameworks = obj.get('framework_connections', '')
-                                if frameworks:
-                                    st.info(f"**Framework Principles:** {frameworks}")
-                            
-                            st.markdown("---")
-                    
-                    # What Went Well / Opportunities
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("### 💚 What Went Well")
-                        went_well = feedback.get('what_went_well', [])
-                        if went_well:
-                            for item in went_well:
-                                st.success(f"✓ {item}")
-                        else:
-                            st.info("Building feedback...")
-                    
-                    with col2:
-                        st.markdown("### 📈 Opportunities to Improve")
-                        opportunities = feedback.get('opportunities_to_improve', [])
-                        if opportunities:
-                            for item in opportunities:
-                                st.warning(f"⚠️ {item}")
-                        else:
-                            st.info("Building feedback...")
-                    
-                    # Sample Phrases
-                    phrases = feedback.get('sample_phrases', {})
-                    if phrases:
-                        st.markdown("### 💬 Sample Phrases to Practice")
+                        col1, col2 = st.columns(2)
                         
-                        phrase_col1, phrase_col2 = st.columns(2)
+                        with col1:
+                            st.markdown("**💬 What Was Said:**")
+                            st.info(f"**Customer:** \"{moment.get('customer_quote', 'N/A')}\"")
+                            st.success(f"**Rep:** \"{moment.get('rep_quote', 'N/A')}\"")
                         
-                        with phrase_col1:
-                            if phrases.get('active_listening'):
-                                with st.expander("🎧 Active Listening"):
-                                    for phrase in phrases.get('active_listening', []):
-                                        st.markdown(f"- _{phrase}_")
-                            
-                            if phrases.get('probing_deeper'):
-                                with st.expander("🔍 Probing Deeper"):
-                                    for phrase in phrases.get('probing_deeper', []):
-                                        st.markdown(f"- _{phrase}_")
-                            
-                            if phrases.get('emotional_acknowledgment'):
-                                with st.expander("💭 Emotional Acknowledgment"):
-                                    for phrase in phrases.get('emotional_acknowledgment', []):
-                                        st.markdown(f"- _{phrase}_")
+                        with col2:
+                            st.markdown("**🎯 Why This Works:**")
+                            st.write(f"**What Happened:** {moment.get('what_happened', 'N/A')}")
+                            st.success(f"**Why Exceptional:** {moment.get('why_exceptional', 'N/A')}")
+                            if moment.get('coaching_insight'):
+                                st.info(f"**Framework:** {moment.get('coaching_insight', '')}")
                         
-                        with phrase_col2:
-                            if phrases.get('spin_implication'):
-                                with st.expander("🎯 SPIN Implication (Build Value!)"):
-                                    for phrase in phrases.get('spin_implication', []):
-                                        st.markdown(f"- _{phrase}_")
-                            
-                            if phrases.get('sandler_pain'):
-                                with st.expander("💼 Sandler Pain Questions"):
-                                    for phrase in phrases.get('sandler_pain', []):
-                                        st.markdown(f"- _{phrase}_")
-                    
-                    # Show full transcript
-                    with st.expander("📄 Full Transcript"):
-                        st.text(row['transcript'])
-
-# ===== TAB 2: EXCEPTIONAL MOMENTS =====
-with tab2:
-    st.header("🌟 Exceptional Moments Feed")
-    st.caption("Share these wins with your team!")
-    
-    exceptional_calls = []
-    
-    for idx, row in df.iterrows():
-        feedback = row['feedback_parsed']
-        if feedback:
-            exceptional = feedback.get('exceptional_moments', [])
-            if exceptional:
-                shareworthy = [m for m in exceptional if m.get('shareworthy')]
-                if shareworthy:
-                    exceptional_calls.append({
-                        'idx': idx,
-                        'row': row,
-                        'moments': shareworthy
-                    })
-    
-    if not exceptional_calls:
-        st.info("No exceptional moments found yet. Keep coaching!")
-    else:
-        for call in exceptional_calls:
-            row = call['row']
-            with st.expander(f"⭐ {row['agent_name']} - {row['filename']} ({row['date']})"):
-                st.write(f"**Agent:** {row['agent_name']}")
-                st.write(f"**Call Outcome:** {row['feedback_parsed'].get('call_outcome', 'unknown').upper()}")
-                
-                st.markdown("---")
-                
-                for moment in call['moments']:
-                    category = moment.get('category', 'general')
-                    category_icons = {
-                        'objection_handling': '🛡️',
-                        'empathy': '❤️',
-                        'active_listening': '🎧',
-                        'probing': '🔍'
-                    }
-                    icon = category_icons.get(category, '⭐')
-                    
-                    st.markdown(f"### {icon} {category.replace('_', ' ').title()}")
-                    st.markdown(f"**⏱️ Timestamp: {moment.get('timestamp', 'N/A')}**")
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("**💬 What Was Said:**")
-                        st.info(f"**Customer:** \"{moment.get('customer_quote', 'N/A')}\"")
-                        st.success(f"**Rep:** \"{moment.get('rep_quote', 'N/A')}\"")
-                    
-                    with col2:
-                        st.markdown("**🎯 Why This Works:**")
-                        st.write(f"**What Happened:** {moment.get('what_happened', 'N/A')}")
-                        st.success(f"**Why Exceptional:** {moment.get('why_exceptional', 'N/A')}")
-                        if moment.get('coaching_insight'):
-                            st.info(f"**Framework:** {moment.get('coaching_insight', '')}")
-                    
-                    st.markdown("---")
+                        st.markdown("---")
 
 # ===== TAB 3: TEAM ANALYTICS =====
 with tab3:
-    st.header("📊 Team Analytics Dashboard")
-    
-    total_calls = len(df)
-    
-    outcomes = []
-    all_scores = []
-    
-    for _, row in df.iterrows():
-        feedback = row['feedback_parsed']
-        if feedback:
-            outcome = feedback.get('call_outcome', '')
-            if outcome:
-                outcomes.append(outcome)
-            
-            scores = feedback.get('call_score', {})
-            if scores and isinstance(scores, dict):
-                overall = scores.get('overall_score', 0)
-                if overall > 0:
-                    all_scores.append(overall)
-    
-    closed = outcomes.count('closed')
-    lost = outcomes.count('lost')
-    total_outcomes = closed + lost
-    close_rate = (closed / total_outcomes * 100) if total_outcomes > 0 else 0
-    avg_score = sum(all_scores) / len(all_scores) if all_scores else 0
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Total Calls", total_calls)
-    with col2:
-        st.metric("Team Close Rate", f"{close_rate:.1f}%")
-    with col3:
-        st.metric("Avg Score", f"{avg_score:.1f}/10")
-    with col4:
-        st.metric("Team W/L", f"{closed}/{lost}")
-    
-    st.markdown("---")
-    
-    st.subheader("🏆 Agent Leaderboard")
-    
-    agent_stats = {}
-    
-    for _, row in df.iterrows():
-        agent = row['agent_name']
-        if pd.isna(agent):
-            continue
-            
-        if agent not in agent_stats:
-            agent_stats[agent] = {
-                'calls': 0,
-                'closed': 0,
-                'lost': 0,
-                'scores': []
-            }
+    if tab3.open:
+        st.header("📊 Team Analytics Dashboard")
         
-        agent_stats[agent]['calls'] += 1
+        total_calls = len(df)
         
-        feedback = row['feedback_parsed']
-        if feedback:
-            outcome = feedback.get('call_outcome', '')
-            if outcome == 'closed':
-                agent_stats[agent]['closed'] += 1
-            elif outcome == 'lost':
-                agent_stats[agent]['lost'] += 1
-            
-            scores = feedback.get('call_score', {})
-            if scores and isinstance(scores, dict):
-                overall = scores.get('overall_score', 0)
-                if overall > 0:
-                    agent_stats[agent]['scores'].append(overall)
-    
-    leaderboard = []
-    for agent, stats in agent_stats.items():
-        total = stats['closed'] + stats['lost']
-        close_rate = (stats['closed'] / total * 100) if total > 0 else 0
-        avg_score = sum(stats['scores']) / len(stats['scores']) if stats['scores'] else 0
+        closed, lost, avg_score = compute_team_totals(df)
+        total_outcomes = closed + lost
+        close_rate = (closed / total_outcomes * 100) if total_outcomes > 0 else 0
         
-        leaderboard.append({
-            'Agent': agent,
-            'Calls': stats['calls'],
-            'Close Rate': f"{close_rate:.1f}%",
-            'Avg Score': f"{avg_score:.1f}/10",
-            'Closed': stats['closed'],
-            'Lost': stats['lost']
-        })
-    
-    if leaderboard:
-        leaderboard_df = pd.DataFrame(leaderboard)
-        leaderboard_df = leaderboard_df.sort_values('Close Rate', ascending=False)
-        st.dataframe(leaderboard_df, use_container_width=True, hide_index=True)
-    else:
-        st.info("Not enough data yet")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Calls", total_calls)
+        with col2:
+            st.metric("Team Close Rate", f"{close_rate:.1f}%")
+        with col3:
+            st.metric("Avg Score", f"{avg_score:.1f}/10")
+        with col4:
+            st.metric("Team W/L", f"{closed}/{lost}")
+        
+        st.markdown("---")
+        
+        st.subheader("🏆 Agent Leaderboard")
+        
+        # Kept in session_state per data version, so reruns skip even the cache lookup and its unpickling
+        data_version = fingerprint_df(df)
+        if st.session_state.get('leaderboard_version') != data_version:
+            st.session_state['leaderboard'] = build_leaderboard(df)
+            st.session_state['leaderboard_version'] = data_version
+        leaderboard_df = st.session_state['leaderboard']
+        
+        if not leaderboard_df.empty:
+            st.dataframe(leaderboard_df, width="stretch", hide_index=True,
+                         column_config=LEADERBOARD_COLUMNS)
+        else:
+            st.info("Not enough data yet")
 
 # ===== TAB 4: CALL SEARCH =====
 with tab4:
-    st.header("🔍 Advanced Call Search")
-    
-    search_type = st.selectbox(
-        "Search By:",
-        ["Keyword", "Customer Intent", "Objection Type", "Service Type", "Outcome"]
-    )
-    
-    if search_type == "Keyword":
-        keyword = st.text_input("Search transcripts for:")
-        if keyword:
-            matches = []
-            for idx, row in df.iterrows():
-                if keyword.lower() in str(row['transcript']).lower():
-                    matches.append(row)
-            
-            st.write(f"Found **{len(matches)}** calls mentioning '{keyword}'")
-            
-            for row in matches:
-                with st.expander(f"📞 {row['agent_name']} - {row['filename']}"):
-                    feedback = row['feedback_parsed']
-                    if feedback:
-                        st.write(f"**Summary:** {feedback.get('summary', '')}")
-                    st.write(f"**Transcript excerpt:** {str(row['transcript'])[:300]}...")
+    if tab4.open:
+        st.header("🔍 Advanced Call Search")
+        
+        search_type = st.selectbox(
+            "Search By:",
+            ["Keyword", "Customer Intent", "Objection Type", "Service Type", "Outcome"],
+            key="search_type"
+        )
+        
+        if search_type == "Keyword":
+            keyword = st.text_input("Search transcripts for:", key="search_query")
+            if keyword:
+                # Row positions only; just the page being shown is copied out of df
+                found = pc.match_substring(pa.array(df['transcript_lower']), keyword.lower())
+                match_positions = np.flatnonzero(found.to_numpy(zero_copy_only=False))
+                
+                st.write(f"Found **{len(match_positions)}** calls mentioning '{keyword}'")
+                
+                # A new keyword starts again from the first page of results
+                if st.session_state.get('search_keyword') != keyword:
+                    st.session_state['search_keyword'] = keyword
+                    st.session_state['search_shown'] = SEARCH_PAGE_SIZE
+                shown = st.session_state['search_shown']
+                
+                for row in df.iloc[match_positions[:shown]].itertuples(index=False):
+                    with st.expander(f"📞 {row.agent_name} - {row.filename}"):
+                        if row.has_feedback:
+                            st.write(f"**Summary:** {row.summary}")
+                        st.write(f"**Transcript excerpt:** {str(row.transcript)[:300]}...")
+                
+                if len(match_positions) > shown:
+                    st.caption(f"Showing {shown} of {len(match_positions)} matches")
+                    if st.button("Load more results"):
+                        st.session_state['search_shown'] = shown + SEARCH_PAGE_SIZE
+                        st.rerun()
 
 st.sidebar.markdown("---")
 st.sidebar.caption("🎓 Powered by SPIN + Sandler")
@@ -0,0 +1,78 @@
+"""Regression tests for reading the Google Sheets export in load_data"""
+import json
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+    
+    def raise_for_status(self):
+        pass
+
+
+def sheet_csv(rows=10, transcript="Agent: hi there\nCustomer: hello\n", disposition="Callback", agents=None, scores=None):
+    """A sheet export with quoted multi-line transcripts and feedback, as the Sheets export writes them"""
+    scores = scores or [7] * rows
+    feedback = [json.dumps({"call_outcome": "closed", "summary": "Line one\nline two",
+                            "call_score": {"overall_score": score}}, indent=2) for score in scores]
+    return pd.DataFrame({
+        "date": [f"2026-10-{i % 9 + 1:02d}" for i in range(rows)],
+        "agent_name": agents or [f"Agent {i % 3}" for i in range(rows)],
+        "filename": [f"call {i}.wav" for i in range(rows)],
+        "transcript": [transcript] * rows,
+        "feedback_json": feedback,
+        "disposition": disposition if isinstance(disposition, list) else [disposition] * rows,
+    }).to_csv(index=False).encode()
+
+
+def run_app(content):
+    st.cache_data.clear()
+    at = AppTest.from_file(str(APP_PATH), default_timeout=60)
+    at.session_state["time_filter"] = "All Time"
+    with mock.patch("requests.get", return_value=FakeResponse(content)):
+        at.run()
+    return at
+
+
+def loaded_calls(at):
+    """Total call count from the sidebar caption, failing on any load error"""
+    assert not at.exception
+    assert not [error.value for error in at.error if "Error loading data" in error.value]
+    captions = [caption.value for caption in at.sidebar.caption if caption.value.startswith("📞 Showing")]
+    assert captions, "dashboard fell back to 'No data available'"
+    return int(captions[0].rsplit(" of ", 1)[1].split()[0])
+
+
+def test_multiline_transcripts_in_a_large_export():
+    # Over 1 MB, so Arrow reads the file in several parallel blocks
+    content = sheet_csv(rows=400, transcript="Agent: hi there\nCustomer: hello\n" * 200)
+    assert len(content) > 1 << 20
+    assert loaded_calls(run_app(content)) == 400
+
+
+@pytest.mark.parametrize("disposition", [
+    [None] * 10,  # all blank: Arrow would infer a null column
+    [None if i % 2 else 1000 + i for i in range(10)],  # numeric Five9 codes with blanks
+])
+def test_blank_or_numeric_disposition(disposition):
+    assert loaded_calls(run_app(sheet_csv(disposition=disposition))) == 10
+
+
+def test_score_average_on_a_tier_threshold():
+    # Averages exactly 7.0 in float64 but 6.9999995 in float32
+    at = run_app(sheet_csv(rows=4, agents=["Agent 0"] * 4, scores=[9.7, 2.2, 9.7, 6.4]))
+    assert loaded_calls(at) == 4
+    tables = [table.value for table in at.dataframe if "✨ Exceptional" in table.value.columns]
+    assert tables, "agent missing from Top Performers"
+    top_performers = tables[0]
+    assert top_performers["Agent"].tolist() == ["Agent 0"]
+    assert top_performers["Score"].tolist() == [7.0]